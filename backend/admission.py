@@ -0,0 +1,117 @@
+"""
+Admission Control
+Bounds how many scan requests are processed at once and how many may wait,
+before their uploads are read or decoded. Beyond that the request is turned
+away with 429 and a Retry-After estimated from recent scan latency, so clients
+back off instead of piling decoded images into memory until the instance is
+OOM-killed.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+
+from fast_responses import FastJSONResponse
+
+# Scan latencies kept for the Retry-After estimate
+LATENCY_SAMPLES = 50
+
+
+class AdmissionController:
+    """
+    At most `max_in_flight` requests admitted at once, with up to `max_queue`
+    more waiting in arrival order. Shared by the middleware and the stats endpoint.
+    """
+
+    def __init__(self, max_in_flight: int = 8, max_queue: int = 16, initial_latency_seconds: float = 5.0):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._waiters = deque()
+        self._latencies = deque([initial_latency_seconds], maxlen=LATENCY_SAMPLES)
+
+    def average_latency(self) -> float:
+        return sum(self._latencies) / len(self._latencies)
+
+    def retry_after(self) -> int:
+        """Seconds until the work ahead of a new request should have drained"""
+        backlog = self.in_flight + len(self._waiters) + 1
+        return max(1, math.ceil(self.average_latency() * backlog / self.max_in_flight))
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_latency_ms": round(self.average_latency() * 1000, 1),
+            "retry_after_seconds": self.retry_after()
+        }
+
+    async def admit(self) -> bool:
+        """Take an in-flight slot, waiting in the queue if needed; False if the queue is full"""
+        if self.in_flight < self.max_in_flight:
+            self.in_flight += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter  # The releasing request hands its slot over
+        except asyncio.CancelledError:
+            if waiter.done():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        return True
+
+    def release(self, latency_seconds: float = None):
+        if latency_seconds is not None:
+            self._latencies.append(latency_seconds)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware applying an AdmissionController to POST requests for `paths`"""
+
+    def __init__(self, app, controller: AdmissionController, paths):
+        self.app = app
+        self.controller = controller
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+        if not await controller.admit():
+            controller.rejected += 1
+            retry_after = controller.retry_after()
+            response = FastJSONResponse(
+                {"detail": f"Server busy, retry in {retry_after} seconds", "retry_after": retry_after},
+                status_code=429,
+                headers={"Retry-After": str(retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        controller.admitted += 1
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(time.monotonic() - start)
@@ -0,0 +1,133 @@
+"""
+Archive Batch Ingestion
+Expands a spooled ZIP or TAR archive into the batch spool directory one member at
+a time, hashing each image as it is copied. Nothing is ever extracted by member
+name, and size limits are enforced on the bytes actually decompressed, so path
+traversal entries and zip bombs can't escape the spool or fill the disk.
+"""
+
+import os
+import posixpath
+import tarfile
+import uuid
+import zipfile
+import zlib
+from typing import List, Tuple
+
+from fastapi import HTTPException
+
+from image_types import IMAGE_EXTENSIONS
+from upload_spool import SpooledFile
+
+# Members are decompressed in chunks of this size
+COPY_CHUNK_BYTES = 1024 * 1024
+
+# A member expanding to more than this many times its compressed size is treated as a bomb
+MAX_COMPRESSION_RATIO = 200
+
+
+class ArchiveLimits:
+    """Per-archive ceilings on member count and decompressed bytes"""
+
+    def __init__(self, max_members: int, max_member_bytes: int, max_total_bytes: int):
+        self.max_members = max_members
+        self.max_member_bytes = max_member_bytes
+        self.max_total_bytes = max_total_bytes
+
+
+class ArchiveExpander:
+    """Copies image members of an archive into SpooledFiles"""
+
+    def __init__(self, spool_dir: str, limits: ArchiveLimits):
+        self.spool_dir = spool_dir
+        self.limits = limits
+        self.files: List[SpooledFile] = []
+        self.skipped: List[str] = []
+        self.total_bytes = 0
+
+    @staticmethod
+    def is_image_member(name: str) -> bool:
+        """Image by extension, ignoring macOS resource forks and hidden files"""
+        base = posixpath.basename(name)
+        if not base or base.startswith('.') or '__MACOSX/' in name:
+            return False
+        return os.path.splitext(base)[1].lower() in IMAGE_EXTENSIONS
+
+    def copy_member(self, name: str, source, compressed_size: int = 0):
+        """Stream one member into the spool, enforcing limits on actual output"""
+        if len(self.files) >= self.limits.max_members:
+            raise HTTPException(status_code=413, detail=f"Archive has more than {self.limits.max_members} images")
+
+        spooled = SpooledFile(name, 'application/octet-stream', os.path.join(self.spool_dir, uuid.uuid4().hex))
+        self.files.append(spooled)
+        try:
+            while True:
+                chunk = source.read(COPY_CHUNK_BYTES)
+                if not chunk:
+                    break
+                spooled.write(chunk)
+                self.total_bytes += len(chunk)
+                if spooled.size > self.limits.max_member_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"'{name}' exceeds {self.limits.max_member_bytes // (1024 * 1024)} MB"
+                    )
+                if self.total_bytes > self.limits.max_total_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Archive expands to more than {self.limits.max_total_bytes // (1024 * 1024)} MB"
+                    )
+                if compressed_size and spooled.size > COPY_CHUNK_BYTES and \
+                        spooled.size > compressed_size * MAX_COMPRESSION_RATIO:
+                    raise HTTPException(status_code=413, detail=f"'{name}' has a suspicious compression ratio")
+        finally:
+            spooled.close()
+
+    def expand_zip(self, path: str):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                if not self.is_image_member(info.filename):
+                    self.skipped.append(info.filename)
+                    continue
+                with archive.open(info) as source:
+                    self.copy_member(info.filename, source, info.compress_size)
+
+    def expand_tar(self, path: str):
+        # Stream mode ('r|*'): members are read strictly in order, gzip/bz2/xz handled transparently
+        with tarfile.open(path, mode='r|*') as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                if not self.is_image_member(member.name):
+                    self.skipped.append(member.name)
+                    continue
+                source = archive.extractfile(member)
+                self.copy_member(member.name, source)
+
+    def discard(self):
+        for spooled in self.files:
+            spooled.discard()
+
+
+def expand_archive(path: str, spool_dir: str, limits: ArchiveLimits) -> Tuple[List[SpooledFile], List[str]]:
+    """
+    Expand a ZIP or TAR (optionally compressed) archive into the spool directory.
+    Returns (spooled images named by member path, skipped member paths).
+    Blocking; call from the threadpool. On error every spooled member is removed.
+    """
+    expander = ArchiveExpander(spool_dir, limits)
+    try:
+        if zipfile.is_zipfile(path):
+            expander.expand_zip(path)
+        else:
+            expander.expand_tar(path)
+    except HTTPException:
+        expander.discard()
+        raise
+    except (zipfile.BadZipFile, tarfile.TarError, zlib.error, EOFError, OSError, NotImplementedError, RuntimeError) as e:
+        # RuntimeError: encrypted ZIP members; NotImplementedError: unsupported compression
+        expander.discard()
+        raise HTTPException(status_code=400, detail=f"Not a readable ZIP or TAR archive: {str(e)}")
+    return expander.files, expander.skipped
@@ -0,0 +1,149 @@
+"""
+Content-Addressed Artifact Store for derived scan images
+Stores processed, masked and annotated images on local disk, sharded by SHA-256,
+with size-bounded least-recently-used eviction
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from typing import Optional, Tuple
+
+
+class ArtifactStore:
+    """Filesystem store keyed by the SHA-256 of each artifact's bytes"""
+
+    EXTENSIONS = {
+        'image/jpeg': '.jpg',
+        'image/webp': '.webp',
+        'image/png': '.png',
+        'image/svg+xml': '.svg',
+    }
+    CONTENT_TYPES = {ext: content_type for content_type, ext in EXTENSIONS.items()}
+
+    DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+    # Eviction trims down to this fraction of the budget so it doesn't run on every put
+    LOW_WATERMARK = 0.9
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._iter_files())
+
+    def _shard_dir(self, digest: str) -> str:
+        """Two levels of 256-way sharding: ab/cd/abcd..."""
+        return os.path.join(self.root, digest[:2], digest[2:4])
+
+    def _iter_files(self):
+        """Yield (path, size, last_access) for every stored artifact"""
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.startswith('.'):
+                    continue  # In-flight temp files
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def put(self, data: bytes, content_type: str) -> str:
+        """
+        Store bytes and return their digest. Storing the same bytes twice
+        is a no-op apart from refreshing the artifact's LRU position.
+        """
+        ext = self.EXTENSIONS.get(content_type)
+        if ext is None:
+            raise ValueError(f"Unsupported artifact type '{content_type}'")
+
+        digest = hashlib.sha256(data).hexdigest()
+        shard = self._shard_dir(digest)
+        path = os.path.join(shard, digest + ext)
+
+        if os.path.exists(path):
+            self._touch(path)
+            return digest
+
+        # Write to a temp file in the same directory, then rename atomically
+        os.makedirs(shard, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=shard, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self._total_bytes += len(data)
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+        return digest
+
+    def locate(self, digest: str) -> Optional[Tuple[str, str]]:
+        """Return (path, content_type) for a digest, or None if unknown or evicted"""
+        if not self.DIGEST_PATTERN.match(digest):
+            return None
+
+        shard = self._shard_dir(digest)
+        for ext, content_type in self.CONTENT_TYPES.items():
+            path = os.path.join(shard, digest + ext)
+            if os.path.exists(path):
+                self._touch(path)
+                return path, content_type
+        return None
+
+    def read(self, digest: str) -> Optional[bytes]:
+        """Return an artifact's bytes, or None if unknown or evicted"""
+        located = self.locate(digest)
+        if located is None:
+            return None
+        with open(located[0], 'rb') as f:
+            return f.read()
+
+    def delete(self, digest: str):
+        """Remove an artifact (e.g. once no scan references it); unknown digests are ignored"""
+        located = self.locate(digest)
+        if located is None:
+            return
+        try:
+            size = os.path.getsize(located[0])
+            os.remove(located[0])
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._total_bytes -= size
+
+    def _touch(self, path: str):
+        """Record an access; mtime doubles as the LRU clock (atime is often disabled)"""
+        try:
+            os.utime(path, None)
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """Delete least-recently-used artifacts until under the low watermark"""
+        with self._lock:
+            files = sorted(self._iter_files(), key=lambda f: f[2])
+            total = sum(size for _, size, _ in files)
+            target = self.max_bytes * self.LOW_WATERMARK
+
+            for path, size, _ in files:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+            self._total_bytes = total
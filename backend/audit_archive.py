@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Audit-Log Archive
+Moves audit logs older than the retention window out of audit_logs into
+date-partitioned Parquet files (AUDIT_ARCHIVE_DIR/date=YYYY-MM-DD/*.parquet,
+zstd-compressed, OCR text included), a chunk per transaction. The archived
+rows, their search-index entries, scan-artifact rows and no longer referenced
+texts are deleted from the database only after their file is written, and
+batch items that pointed at them are unlinked. Unreferenced artifact images
+are left to the artifact store's LRU eviction.
+
+audit_counters and audit_rollups keep counting archived logs, so /api/v1/stats
+and the trend endpoint cover the whole history; the search endpoint reads the
+archive when its time range reaches back into it.
+
+Usage:
+    python audit_archive.py --retention-days 365
+The API also runs it every AUDIT_ARCHIVE_INTERVAL_HOURS when AUDIT_RETENTION_DAYS is set.
+"""
+
+import argparse
+import heapq
+import os
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from audit_store import load_texts, release_log_references, release_texts, search_query_terms, search_snippet, unindex_log
+from database import SessionLocal, AuditLog, init_db
+
+AUDIT_ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", "./audit_archive")
+AUDIT_RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", "0"))  # 0 = keep everything in audit_logs
+AUDIT_ARCHIVE_INTERVAL_HOURS = float(os.getenv("AUDIT_ARCHIVE_INTERVAL_HOURS", "24"))
+
+# Logs per archive file / transaction
+ARCHIVE_CHUNK_ROWS = 5000
+
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("filename", pa.string()),
+    ("user_id", pa.int64()),
+    ("username", pa.string()),
+    ("compliance_status", pa.string()),
+    ("confidence_score", pa.float64()),
+    ("missing_keywords", pa.string()),
+    ("expiry_status", pa.string()),
+    ("image_quality", pa.string()),
+    ("blur_variance", pa.float64()),
+    ("timestamp", pa.timestamp("us")),
+    ("processing_time_ms", pa.float64()),
+    ("extracted_text", pa.string()),
+])
+
+ARCHIVE_COLUMNS = [name for name in ARCHIVE_SCHEMA.names if name != "extracted_text"]
+
+# Hive partition key of the archive directories (date=YYYY-MM-DD)
+PARTITION_SCHEMA = pa.schema([("date", pa.string())])
+
+
+# ==========================
+# Writing
+# ==========================
+
+def archive_chunk(db: Session, cutoff: datetime, archive_dir: str = AUDIT_ARCHIVE_DIR) -> int:
+    """Archive the oldest chunk of logs older than cutoff and commit; returns logs archived"""
+    logs = db.execute(
+        select(*[getattr(AuditLog, name) for name in ARCHIVE_COLUMNS], AuditLog.text_digest, AuditLog.extracted_text)
+        .where(AuditLog.timestamp < cutoff)
+        .order_by(AuditLog.timestamp, AuditLog.id)
+        .limit(ARCHIVE_CHUNK_ROWS)
+    ).all()
+    if not logs:
+        return 0
+    texts = load_texts(db, logs)
+
+    by_day = {}
+    for log in logs:
+        by_day.setdefault(log.timestamp.date(), []).append(log)
+    for day, day_logs in by_day.items():
+        rows = [dict(log._asdict(), extracted_text=texts[log.id]) for log in day_logs]
+        table = pa.Table.from_pylist(rows, schema=ARCHIVE_SCHEMA)
+        # Named after its first log: files sort in time order, and a retry after a crash overwrites
+        first = day_logs[0]
+        directory = os.path.join(archive_dir, f"date={day.isoformat()}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{first.timestamp:%H%M%S%f}-{first.id}.parquet")
+        pq.write_table(table, path + ".tmp", compression="zstd")
+        os.replace(path + ".tmp", path)
+
+    for log in logs:
+        unindex_log(db, log.id, texts[log.id])
+    log_ids = [log.id for log in logs]
+    release_log_references(db, log_ids)
+    db.execute(delete(AuditLog).where(AuditLog.id.in_(log_ids)))
+    release_texts(db, [log.text_digest for log in logs])
+    db.commit()
+    return len(logs)
+
+
+def archive_old_logs(retention_days: int, archive_dir: str = AUDIT_ARCHIVE_DIR) -> int:
+    """Archive every log older than retention_days; returns logs archived"""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    archived = 0
+    db = SessionLocal()
+    try:
+        while True:
+            moved = archive_chunk(db, cutoff, archive_dir)
+            if not moved:
+                return archived
+            archived += moved
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def run_archiver(stop: threading.Event):
+    """Archive on AUDIT_ARCHIVE_INTERVAL_HOURS until stop is set (API background thread)"""
+    while not stop.is_set():
+        try:
+            archived = archive_old_logs(AUDIT_RETENTION_DAYS)
+            if archived:
+                print(f"Audit archive: moved {archived} logs older than {AUDIT_RETENTION_DAYS} days")
+        except Exception:
+            traceback.print_exc()
+        stop.wait(AUDIT_ARCHIVE_INTERVAL_HOURS * 3600)
+
+
+# ==========================
+# Reading
+# ==========================
+
+def archived_days(archive_dir: str = AUDIT_ARCHIVE_DIR) -> List[str]:
+    if not os.path.isdir(archive_dir):
+        return []
+    return sorted(name[len("date="):] for name in os.listdir(archive_dir) if name.startswith("date="))
+
+
+def archive_end(archive_dir: str = AUDIT_ARCHIVE_DIR) -> Optional[datetime]:
+    """End of the newest archived day; queries reaching back before it need the archive"""
+    days = archived_days(archive_dir)
+    return datetime.fromisoformat(days[-1]) + timedelta(days=1) if days else None
+
+
+def _dataset(archive_dir: str):
+    return ds.dataset(
+        archive_dir, format="parquet",
+        partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+        schema=pa.unify_schemas([ARCHIVE_SCHEMA, PARTITION_SCHEMA])
+    )
+
+
+def _filter(start=None, end=None, compliance_status=None, user_id=None):
+    """Row filter; the time range also prunes date= partitions, so days outside it are never opened"""
+    conditions = []
+    if start is not None:
+        conditions.append(ds.field("date") >= start.date().isoformat())
+        conditions.append(ds.field("timestamp") >= pa.scalar(start, pa.timestamp("us")))
+    if end is not None:
+        conditions.append(ds.field("date") <= end.date().isoformat())
+        conditions.append(ds.field("timestamp") <= pa.scalar(end, pa.timestamp("us")))
+    if compliance_status:
+        conditions.append(ds.field("compliance_status") == compliance_status)
+    if user_id is not None:
+        conditions.append(ds.field("user_id") == user_id)
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def archived_batches(columns: List[str], start=None, end=None, compliance_status=None, user_id=None,
+                     batch_rows: int = ARCHIVE_CHUNK_ROWS, archive_dir: str = AUDIT_ARCHIVE_DIR):
+    """Archived logs matching the filters as lists of `columns` dicts, oldest day first"""
+    if not archived_days(archive_dir):
+        return
+    scanner = _dataset(archive_dir).scanner(
+        columns=columns, filter=_filter(start, end, compliance_status, user_id), batch_size=batch_rows
+    )
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            yield batch.to_pylist()
+
+
+def archived_rows(columns: List[str], archive_dir: str = AUDIT_ARCHIVE_DIR):
+    """Every archived log as a dict of `columns`, a record batch at a time"""
+    for batch in archived_batches(columns, archive_dir=archive_dir):
+        yield from batch
+
+
+def search_archive(query: str, limit: int, offset: int, compliance_status=None, user_id=None,
+                   start=None, end=None, archive_dir: str = AUDIT_ARCHIVE_DIR) -> List[Dict]:
+    """
+    Archived logs containing every term of `query` (case-insensitive substring),
+    most occurrences first, then newest. Streams the id, time and text of the
+    days in range a record batch at a time, keeping only the best offset + limit
+    matches; the other columns are read for the returned page only.
+    """
+    if not archived_days(archive_dir):
+        return []
+    terms = [term.lower() for term in search_query_terms(query)]
+    dataset = _dataset(archive_dir)
+    scanner = dataset.scanner(
+        columns=["id", "timestamp", "extracted_text"], filter=_filter(start, end, compliance_status, user_id)
+    )
+
+    best = []  # Min-heap of (score, timestamp, id): the worst kept match is popped first
+    for batch in scanner.to_batches():
+        if batch.num_rows == 0:
+            continue
+        lowered = pc.utf8_lower(pc.fill_null(batch.column("extracted_text"), ""))
+        mask = None
+        score = None
+        for term in terms:
+            matched = pc.match_substring(lowered, term)
+            count = pc.count_substring(lowered, term)
+            mask = matched if mask is None else pc.and_(mask, matched)
+            score = count if score is None else pc.add(score, count)
+        matches = zip(
+            pc.filter(score, mask).to_pylist(),
+            pc.filter(batch.column("timestamp"), mask).to_pylist(),
+            pc.filter(batch.column("id"), mask).to_pylist()
+        )
+        for match in matches:
+            if len(best) < offset + limit:
+                heapq.heappush(best, match)
+            elif match > best[0]:
+                heapq.heapreplace(best, match)
+
+    page = sorted(best, reverse=True)[offset:offset + limit]
+    if not page:
+        return []
+    days = sorted({timestamp.date().isoformat() for _, timestamp, _ in page})
+    rows = dataset.to_table(
+        columns=ARCHIVE_COLUMNS + ["extracted_text"],
+        filter=ds.field("date").isin(days) & ds.field("id").isin([log_id for _, _, log_id in page])
+    ).to_pylist()
+    by_id = {row["id"]: row for row in rows}
+
+    results = []
+    for score, _, log_id in page:
+        row = by_id[log_id]
+        row["score"] = float(score)
+        row["snippet"] = search_snippet(row.pop("extracted_text"), query)
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move audit logs older than the retention window to Parquet")
+    parser.add_argument("--retention-days", type=int, default=AUDIT_RETENTION_DAYS or 365,
+                        help="Keep logs newer than this in audit_logs (default: AUDIT_RETENTION_DAYS or 365)")
+    parser.add_argument("--archive-dir", default=AUDIT_ARCHIVE_DIR, help="Archive root (default: AUDIT_ARCHIVE_DIR)")
+    args = parser.parse_args()
+
+    init_db()
+    archived = archive_old_logs(args.retention_days, args.archive_dir)
+    print(f"Archived {archived} audit logs older than {args.retention_days} days to {args.archive_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,359 @@
+"""
+Write-Behind Audit-Log Buffer
+Scans that don't need the new audit log's id hand their row to this buffer and
+respond straight away; a background thread writes buffered rows with
+write_audit_logs, up to AUDIT_BUFFER_FLUSH_ROWS per transaction or every
+AUDIT_BUFFER_FLUSH_SECONDS, and drains the buffer on shutdown.
+
+The buffer is bounded: when AUDIT_BUFFER_MAX_ROWS rows are waiting, submit()
+returns False and the caller writes the row itself.
+
+With AUDIT_JOURNAL_DIR set, every row is also appended to a per-process JSON
+Lines journal before submit() returns, and a checkpoint line is added after
+each committed flush. Rows a crashed process never committed are replayed
+from its journal at the next startup. A crash between a commit and its
+checkpoint replays that one flush again (at-least-once).
+"""
+
+import glob
+import os
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+
+import orjson
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+from audit_store import write_audit_logs
+from database import SessionLocal
+
+try:
+    import fcntl
+except ImportError:  # Windows: journals are not locked
+    fcntl = None
+
+AUDIT_BUFFER_MAX_ROWS = int(os.getenv("AUDIT_BUFFER_MAX_ROWS", "10000"))
+AUDIT_BUFFER_FLUSH_ROWS = int(os.getenv("AUDIT_BUFFER_FLUSH_ROWS", "64"))
+AUDIT_BUFFER_FLUSH_SECONDS = float(os.getenv("AUDIT_BUFFER_FLUSH_SECONDS", "0.5"))
+AUDIT_JOURNAL_DIR = os.getenv("AUDIT_JOURNAL_DIR", "")
+
+# A journal larger than this is rewritten with only its uncommitted rows
+JOURNAL_COMPACT_BYTES = 8 * 1024 * 1024
+
+# Failures that say nothing about the row: the database was locked or busy
+RETRYABLE_SQLSTATES = {"40001", "40P01", "55P03"}  # PostgreSQL serialization failure, deadlock, lock timeout
+RETRYABLE_MESSAGES = ("database is locked", "database table is locked", "database is busy")  # SQLite
+
+
+# ==========================
+# Journal
+# ==========================
+
+def _try_lock(f) -> bool:
+    """Exclusive lock on an open journal; False if another live process holds it"""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _same_file(f, path: str) -> bool:
+    """Whether path still names the open file f (not removed or replaced since it was opened)"""
+    try:
+        return os.path.samestat(os.fstat(f.fileno()), os.stat(path))
+    except FileNotFoundError:
+        return False
+
+
+def read_journal(path: str):
+    """Rows of a journal not covered by its last checkpoint, oldest first"""
+    rows = {}
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                entry = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                continue  # Line cut short by a crash
+            if "committed" in entry:
+                for seq in [seq for seq in rows if seq <= entry["committed"]]:
+                    del rows[seq]
+            else:
+                row = entry["row"]
+                if row.get("timestamp"):
+                    row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+                rows[entry["seq"]] = row
+    return [rows[seq] for seq in sorted(rows)]
+
+
+class AuditJournal:
+    """Append-only JSON Lines journal of buffered rows, one file per process"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, f"audit-journal-{os.getpid()}.jsonl")
+        self._file = None
+
+    def recover(self):
+        """
+        Rows left uncommitted by processes that are no longer running (including
+        an earlier process with our pid); their journals are removed. Call before open().
+        """
+        recovered = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "audit-journal-*.jsonl"))):
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                continue  # Recovered by another worker meanwhile
+            with f:
+                if not _try_lock(f) or not _same_file(f, path):
+                    continue  # Journal of another live worker, or already recovered and removed
+                recovered.extend(read_journal(path))
+                os.remove(path)  # Under the lock, so no other worker can read it after us
+        return recovered
+
+    def open(self):
+        """
+        Create this process's journal, locked before it is visible: it is written
+        under a name recover() doesn't match and renamed once the lock is held
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        if fcntl is None:
+            self._file = open(self.path, "ab")
+            return
+        self._file = open(self.path + ".tmp", "wb")
+        _try_lock(self._file)
+        os.replace(self.path + ".tmp", self.path)
+
+    def _write(self, entry: dict):
+        self._file.write(orjson.dumps(entry, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n")
+        self._file.flush()
+
+    def append(self, seq: int, row: dict):
+        self._write({"seq": seq, "row": row})
+
+    def dead_letter(self, row: dict, error: str):
+        """Keep a row that can't be written where an operator can inspect it"""
+        path = os.path.join(self.directory, "audit-dead-letters.jsonl")
+        entry = {"failed_at": datetime.utcnow(), "error": error, "row": row}
+        with open(path, "ab") as f:
+            f.write(orjson.dumps(entry, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n")
+
+    def checkpoint(self, seq: int, pending, compact: bool = False):
+        """
+        Record that rows up to seq are committed; compact once the file is large,
+        or when asked to because rows older than seq are still pending
+        """
+        if compact or not pending or self._file.tell() > JOURNAL_COMPACT_BYTES:
+            self._file.seek(0)
+            self._file.truncate()
+            for pending_seq, row in pending:
+                self.append(pending_seq, row)
+        else:
+            self._write({"committed": seq})
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.remove(self.path)  # Everything was committed by stop()
+
+
+# ==========================
+# Write Errors
+# ==========================
+
+def _retryable(error: DBAPIError) -> bool:
+    """Whether a write failed because of a lock, a busy database or a dropped connection"""
+    if error.connection_invalidated:
+        return True
+    code = getattr(error.orig, "pgcode", None) or getattr(error.orig, "sqlstate", None)
+    message = str(error.orig).lower()
+    return code in RETRYABLE_SQLSTATES or any(marker in message for marker in RETRYABLE_MESSAGES)
+
+
+def _database_reachable() -> bool:
+    """Whether a trivial query gets through, i.e. a write error was the row's fault"""
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
+    finally:
+        db.close()
+
+
+# ==========================
+# Buffer
+# ==========================
+
+class AuditLogBuffer:
+    """Bounded in-process queue of audit_logs rows, persisted by one background thread"""
+
+    def __init__(
+        self,
+        max_rows: int = AUDIT_BUFFER_MAX_ROWS,
+        flush_rows: int = AUDIT_BUFFER_FLUSH_ROWS,
+        flush_seconds: float = AUDIT_BUFFER_FLUSH_SECONDS,
+        journal_dir: str = AUDIT_JOURNAL_DIR
+    ):
+        self.max_rows = max(1, max_rows)
+        self.flush_rows = max(1, flush_rows)
+        self.flush_seconds = flush_seconds
+        self.journal = AuditJournal(journal_dir) if journal_dir else None
+        self._pending = deque()  # (seq, row), oldest first
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._seq = 0
+        self.flushed_rows = 0
+        self.overflowed = 0
+        self.failed_flushes = 0
+        self.dead_letters = 0
+        self.last_flush_ms = 0.0
+
+    def start(self):
+        if self.journal is not None:
+            recovered = self.journal.recover()
+            self.journal.open()
+            for row in recovered:
+                self.submit(row, block=True)
+            if recovered:
+                print(f"Audit buffer: replaying {len(recovered)} journaled rows")
+        self._thread = threading.Thread(target=self._run, name="audit-buffer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Write everything still buffered, then stop the flush thread"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.journal is not None and not self._pending:
+            self.journal.close()
+
+    def submit(self, row: dict, block: bool = False) -> bool:
+        """Queue a row for writing; False (row not taken) when the buffer is full"""
+        with self._lock:
+            if len(self._pending) >= self.max_rows and not block:
+                self.overflowed += 1
+                return False
+            row = dict(row)
+            row.setdefault("timestamp", datetime.utcnow())  # Time of the scan, not of the flush
+            self._seq += 1
+            if self.journal is not None:
+                self.journal.append(self._seq, row)
+            self._pending.append((self._seq, row))
+            full = len(self._pending) >= self.flush_rows
+        if full:
+            self._wake.set()
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._pending),
+            "max_rows": self.max_rows,
+            "flushed_rows": self.flushed_rows,
+            "overflowed": self.overflowed,
+            "failed_flushes": self.failed_flushes,
+            "dead_letters": self.dead_letters,
+            "last_flush_ms": round(self.last_flush_ms, 1),
+            "journal": self.journal.path if self.journal is not None else None
+        }
+
+    def _write(self, rows) -> None:
+        db = SessionLocal()
+        try:
+            write_audit_logs(db, rows, return_ids=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _write_singly(self, batch):
+        """
+        Write a failed batch row by row; returns (seqs that left the buffer, rows
+        written, rows kept). Stops at the first row the database couldn't take at
+        all (locked, busy or unreachable) and keeps it and the rest for the next
+        flush; any other error dead-letters just that row.
+        """
+        done, written = set(), 0
+        for index, (seq, row) in enumerate(batch):
+            try:
+                self._write([row])
+                written += 1
+            except DBAPIError as e:
+                if _retryable(e) or (isinstance(e, OperationalError) and not _database_reachable()):
+                    return done, written, len(batch) - index
+                self._dead_letter(row, e)
+            except Exception as e:
+                self._dead_letter(row, e)
+            done.add(seq)
+        return done, written, 0
+
+    def _dead_letter(self, row: dict, error: Exception):
+        self.dead_letters += 1
+        print(f"Audit buffer: dropping unwritable audit log ({error!r:.200}): {row.get('filename')!r}")
+        if self.journal is not None:
+            try:
+                self.journal.dead_letter(row, repr(error))
+            except Exception:
+                traceback.print_exc()
+
+    def _flush(self) -> bool:
+        """
+        Write the oldest rows in one transaction; they leave the buffer only once
+        committed or dead-lettered. Returns whether any row left the buffer.
+        """
+        with self._lock:
+            batch = [self._pending[i] for i in range(min(self.flush_rows, len(self._pending)))]
+        if not batch:
+            return False
+
+        start = time.perf_counter()
+        try:
+            self._write([row for _, row in batch])
+            done, written, kept = {seq for seq, _ in batch}, len(batch), 0
+        except Exception:
+            self.failed_flushes += 1
+            traceback.print_exc()
+            done, written, kept = self._write_singly(batch)
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+        if not done:
+            return False  # Kept for the next attempt
+
+        with self._lock:
+            head = [self._pending.popleft() for _ in batch]
+            # Rows kept for a retry go back to the front, in order
+            self._pending.extendleft(reversed([entry for entry in head if entry[0] not in done]))
+            self.flushed_rows += written
+            if self.journal is not None:
+                self.journal.checkpoint(batch[-1][0], list(self._pending), compact=kept > 0)
+        return True
+
+    def _run(self):
+        while True:
+            stopping = self._stop.is_set()
+            while len(self._pending) >= self.flush_rows and self._flush():
+                pass
+            if self._pending:
+                self._flush()
+            if stopping:
+                # Drain; give up after repeated failures so shutdown can't hang (the journal keeps the rows)
+                failures = 0
+                while self._pending and failures < 3:
+                    if not self._flush():
+                        failures += 1
+                        time.sleep(0.5)
+                return
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
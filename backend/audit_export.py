@@ -0,0 +1,143 @@
+"""
+Audit-Log Export
+Streams audit logs, oldest first, as CSV, JSON Lines or Parquet for full
+exports. Rows are read a chunk at a time (server-side cursor on PostgreSQL)
+and each chunk is encoded and handed on before the next is read, so memory
+stays flat however many logs are exported. Parquet output gets one row group
+per chunk and is streamed as it is written.
+
+Logs moved to the Parquet archive (audit_archive.py) are exported first when
+archived logs are included.
+"""
+
+import csv
+import io
+import os
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List
+
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import select
+
+from audit_archive import ARCHIVE_COLUMNS, ARCHIVE_SCHEMA, archived_batches
+from audit_store import load_texts
+from database import SessionLocal, AuditLog
+
+# Rows read, encoded and sent at a time (and rows per Parquet row group)
+AUDIT_EXPORT_CHUNK_ROWS = int(os.getenv("AUDIT_EXPORT_CHUNK_ROWS", "5000"))
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def export_columns(include_text: bool) -> List[str]:
+    return ARCHIVE_COLUMNS + ["extracted_text"] if include_text else list(ARCHIVE_COLUMNS)
+
+
+def export_batches(start=None, end=None, compliance_status=None, user_id=None, include_text: bool = False,
+                   include_archive: bool = False, chunk_rows: int = AUDIT_EXPORT_CHUNK_ROWS) -> Iterator[List[Dict]]:
+    """Matching audit logs as lists of up to chunk_rows dicts, oldest first; opens its own session"""
+    columns = export_columns(include_text)
+    if include_archive:
+        yield from archived_batches(columns, start, end, compliance_status, user_id, chunk_rows)
+
+    query = select(*[getattr(AuditLog, name) for name in ARCHIVE_COLUMNS])
+    if include_text:
+        query = query.add_columns(AuditLog.text_digest, AuditLog.extracted_text)
+    if start is not None:
+        query = query.where(AuditLog.timestamp >= start)
+    if end is not None:
+        query = query.where(AuditLog.timestamp <= end)
+    if compliance_status:
+        query = query.where(AuditLog.compliance_status == compliance_status)
+    if user_id is not None:
+        query = query.where(AuditLog.user_id == user_id)
+    query = query.order_by(AuditLog.timestamp, AuditLog.id).execution_options(yield_per=chunk_rows)
+
+    db = SessionLocal()
+    try:
+        for chunk in db.execute(query).partitions():
+            texts = load_texts(db, chunk) if include_text else {}
+            yield [
+                {name: row._mapping[name] for name in ARCHIVE_COLUMNS} | (
+                    {"extracted_text": texts[row.id]} if include_text else {}
+                )
+                for row in chunk
+            ]
+    finally:
+        db.close()
+
+
+# ==========================
+# Encoders
+# ==========================
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def csv_stream(batches: Iterable[List[Dict]], columns: List[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    for batch in batches:
+        writer.writerows({name: _csv_value(value) for name, value in row.items()} for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")  # Header of an empty export
+
+
+def jsonl_stream(batches: Iterable[List[Dict]], columns: List[str]) -> Iterator[bytes]:
+    for batch in batches:
+        yield b"".join(orjson.dumps(row) + b"\n" for row in batch)
+
+
+class _ChunkSink:
+    """Write-only file object that collects what ParquetWriter writes until taken"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def parquet_stream(batches: Iterable[List[Dict]], columns: List[str]) -> Iterator[bytes]:
+    schema = pa.schema([ARCHIVE_SCHEMA.field(name) for name in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for batch in batches:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))  # One row group
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()  # Footer
+
+
+EXPORT_ENCODERS = {"csv": csv_stream, "jsonl": jsonl_stream, "parquet": parquet_stream}
@@ -0,0 +1,432 @@
+"""
+Bulk Audit-Log Persistence
+Writes many audit_logs rows per statement and per transaction instead of one
+commit per scan. Used by the scan endpoints and the batch dispatcher.
+
+- Ids needed: one multi-row INSERT ... RETURNING per chunk (SQLAlchemy's
+  insertmanyvalues), with ids returned in input order
+- No ids needed on PostgreSQL (psycopg2): COPY ... FROM STDIN
+- Otherwise: executemany INSERT
+
+Every write also adds to audit_counters (per compliance status) and to the
+hourly/daily audit_rollups in the same transaction, so /api/v1/stats and the
+trend endpoint read a handful of rows instead of scanning history.
+
+OCR text is not stored in audit_logs: it goes zlib-compressed into audit_texts,
+keyed by SHA-256 (identical texts are stored once), and the log row keeps only
+the digest. Listings never touch it; the report and detail views load it on demand.
+
+Each log's text is also added to the full-text index (audit_log_search: FTS5 on
+SQLite, tsvector + GIN on PostgreSQL) in the same transaction as the insert.
+"""
+
+import hashlib
+import io
+import json
+import re
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import DateTime, bindparam, delete, func, insert, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, AuditLog, AuditCounter, AuditText, BatchItem, ScanArtifact, SEARCH_TABLE
+from rollups import update_audit_rollups
+
+AUDIT_LOG_COLUMNS = [column.name for column in AuditLog.__table__.columns if column.name != "id"]
+
+TEXT_CODEC = "zlib"
+
+# Rows per COPY buffer
+COPY_CHUNK_ROWS = 5000
+
+
+def _normalize(row: Dict) -> Dict:
+    """Every row gets every column, so executemany and COPY see one shape"""
+    values = {column: row.get(column) for column in AUDIT_LOG_COLUMNS}
+    if values["timestamp"] is None:
+        values["timestamp"] = datetime.utcnow()
+    return values
+
+
+def _copy_value(value) -> str:
+    """Encode a value for COPY's text format"""
+    if value is None:
+        return "\\N"
+    text = value.isoformat() if isinstance(value, datetime) else str(value)
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _copy_rows(db: Session, rows: List[Dict]):
+    """COPY rows into audit_logs on the session's own connection (same transaction)"""
+    cursor = db.connection().connection.cursor()
+    try:
+        sql = f"COPY audit_logs ({', '.join(AUDIT_LOG_COLUMNS)}) FROM STDIN"
+        for start in range(0, len(rows), COPY_CHUNK_ROWS):
+            buffer = io.StringIO()
+            for row in rows[start:start + COPY_CHUNK_ROWS]:
+                buffer.write("\t".join(_copy_value(row[column]) for column in AUDIT_LOG_COLUMNS))
+                buffer.write("\n")
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+    finally:
+        cursor.close()
+
+
+def supports_copy(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    return dialect.name == "postgresql" and dialect.driver == "psycopg2"
+
+
+def update_audit_counters(db: Session, rows: List[Dict], sign: int = 1):
+    """
+    Add (sign=1) or remove (sign=-1) rows' contribution to audit_counters,
+    without committing. Rows need compliance_status and confidence_score.
+    """
+    deltas = {}
+    for row in rows:
+        status = row.get("compliance_status") or "UNKNOWN"
+        count, total = deltas.get(status, (0, 0.0))
+        deltas[status] = (count + sign, total + sign * (row.get("confidence_score") or 0.0))
+
+    dialect = db.get_bind().dialect.name
+    for status, (count, total) in deltas.items():
+        if dialect in ("sqlite", "postgresql"):
+            dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            stmt = dialect_insert(AuditCounter).values(compliance_status=status, scan_count=count, confidence_sum=total)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[AuditCounter.compliance_status],
+                set_={
+                    "scan_count": AuditCounter.scan_count + stmt.excluded.scan_count,
+                    "confidence_sum": AuditCounter.confidence_sum + stmt.excluded.confidence_sum
+                }
+            ))
+        else:
+            result = db.execute(
+                update(AuditCounter).where(AuditCounter.compliance_status == status).values(
+                    scan_count=AuditCounter.scan_count + count,
+                    confidence_sum=AuditCounter.confidence_sum + total
+                )
+            )
+            if result.rowcount == 0:
+                db.add(AuditCounter(compliance_status=status, scan_count=count, confidence_sum=total))
+                db.flush()
+
+
+def write_audit_logs(db: Session, rows: List[Dict], return_ids: bool = True) -> List[int]:
+    """
+    Insert audit_logs rows (dicts keyed by column name) without committing.
+    extracted_text (and an optional word_boxes list) goes to audit_texts.
+    Returns the new ids in the same order as `rows` when return_ids is set.
+    """
+    if not rows:
+        return []
+    bodies = [row.get("extracted_text") for row in rows]
+    texts = [pack_text(body, row.get("word_boxes")) for body, row in zip(bodies, rows)]
+    store_texts(db, texts)
+    rows = [_normalize(row) for row in rows]
+    for row, packed in zip(rows, texts):
+        row["text_digest"] = packed["digest"]
+        row["extracted_text"] = None
+    update_audit_counters(db, rows)
+    update_audit_rollups(db, rows)
+
+    if return_ids:
+        result = db.execute(
+            insert(AuditLog.__table__).returning(AuditLog.__table__.c.id, sort_by_parameter_order=True),
+            rows
+        )
+        ids = [row.id for row in result]
+        index_logs(db, list(zip(ids, bodies)))
+        return ids
+
+    last_id = db.scalar(select(func.max(AuditLog.id))) if search_supported(db) else None
+    if supports_copy(db):
+        _copy_rows(db, rows)
+    else:
+        db.execute(insert(AuditLog.__table__), rows)
+    index_logs_after(db, last_id, {packed["digest"]: body for packed, body in zip(texts, bodies)})
+    return []
+
+
+# ==========================
+# OCR Text Side Table
+# ==========================
+
+def _dialect_insert(db: Session):
+    """INSERT construct with ON CONFLICT support, or None on other databases"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite.insert
+    if dialect == "postgresql":
+        return postgresql.insert
+    return None
+
+
+def pack_text(text: str, word_boxes=None) -> Dict:
+    """AuditText values for OCR text (and optional word boxes), digest included"""
+    raw = (text or "").encode("utf-8")
+    boxes = json.dumps(word_boxes, separators=(",", ":")).encode("utf-8") if word_boxes is not None else None
+    digest = hashlib.sha256((raw + b"\0" + boxes) if boxes is not None else raw).hexdigest()
+    return {
+        "digest": digest,
+        "codec": TEXT_CODEC,
+        "text_data": zlib.compress(raw),
+        "word_boxes": zlib.compress(boxes) if boxes is not None else None,
+        "text_length": len(text or "")
+    }
+
+
+def store_texts(db: Session, texts: List[Dict]):
+    """Insert packed texts not stored yet, without committing"""
+    unique = list({packed["digest"]: packed for packed in texts}.values())
+    if not unique:
+        return
+    dialect_insert = _dialect_insert(db)
+    if dialect_insert is not None:
+        db.execute(dialect_insert(AuditText).on_conflict_do_nothing(index_elements=[AuditText.digest]), unique)
+        return
+    existing = set(db.scalars(select(AuditText.digest).where(AuditText.digest.in_([p["digest"] for p in unique]))))
+    missing = [packed for packed in unique if packed["digest"] not in existing]
+    if missing:
+        db.execute(insert(AuditText), missing)
+
+
+def load_text(db: Session, log: AuditLog) -> str:
+    """OCR text of an audit log, from audit_texts or (not yet migrated) inline"""
+    if log.text_digest is None:
+        return log.extracted_text
+    data = db.scalar(select(AuditText.text_data).where(AuditText.digest == log.text_digest))
+    return zlib.decompress(data).decode("utf-8") if data is not None else None
+
+
+def load_texts(db: Session, logs) -> Dict[int, str]:
+    """OCR text of several audit logs (id -> text) with one audit_texts query"""
+    digests = {log.text_digest for log in logs if log.text_digest is not None}
+    data = dict(db.execute(select(AuditText.digest, AuditText.text_data).where(AuditText.digest.in_(digests))).all()) if digests else {}
+    return {
+        log.id: zlib.decompress(data[log.text_digest]).decode("utf-8") if log.text_digest in data else log.extracted_text
+        for log in logs
+    }
+
+
+def load_word_boxes(db: Session, log: AuditLog) -> Optional[list]:
+    if log.text_digest is None:
+        return None
+    data = db.scalar(select(AuditText.word_boxes).where(AuditText.digest == log.text_digest))
+    return json.loads(zlib.decompress(data)) if data is not None else None
+
+
+def release_text(db: Session, digest: Optional[str]):
+    """Drop a stored text once no audit log references it (call after deleting the log)"""
+    if digest is not None:
+        release_texts(db, [digest])
+
+
+def release_texts(db: Session, digests):
+    """release_text for many digests at once"""
+    digests = list({digest for digest in digests if digest is not None})
+    if not digests:
+        return
+    db.flush()
+    referenced = set(db.scalars(select(AuditLog.text_digest).where(AuditLog.text_digest.in_(digests)).distinct()))
+    unreferenced = [digest for digest in digests if digest not in referenced]
+    if unreferenced:
+        db.execute(delete(AuditText).where(AuditText.digest.in_(unreferenced)))
+
+
+def release_log_references(db: Session, log_ids) -> List[str]:
+    """
+    Delete the scan artifacts of audit logs being removed and unlink their batch
+    items, without committing; returns artifact digests no longer referenced
+    """
+    log_ids = list(log_ids)
+    if not log_ids:
+        return []
+    digests = set(db.scalars(select(ScanArtifact.digest).where(ScanArtifact.audit_log_id.in_(log_ids))))
+    db.execute(delete(ScanArtifact).where(ScanArtifact.audit_log_id.in_(log_ids)))
+    db.execute(update(BatchItem).where(BatchItem.audit_log_id.in_(log_ids)).values(audit_log_id=None))
+    if not digests:
+        return []
+    referenced = set(db.scalars(select(ScanArtifact.digest).where(ScanArtifact.digest.in_(digests)).distinct()))
+    return sorted(digests - referenced)
+
+
+def migrate_inline_texts(db: Session, chunk_rows: int = 500) -> int:
+    """Move one chunk of legacy inline extracted_text into audit_texts; returns rows moved"""
+    rows = db.execute(
+        select(AuditLog.id, AuditLog.extracted_text)
+        .where(AuditLog.text_digest.is_(None), AuditLog.extracted_text.is_not(None))
+        .limit(chunk_rows)
+    ).all()
+    if not rows:
+        return 0
+    packed = {row.id: pack_text(row.extracted_text) for row in rows}
+    store_texts(db, list(packed.values()))
+    db.execute(
+        update(AuditLog),  # ORM bulk UPDATE by primary key
+        [{"id": log_id, "text_digest": p["digest"], "extracted_text": None} for log_id, p in packed.items()]
+    )
+    db.commit()
+    return len(rows)
+
+
+def catch_up_audit_texts():
+    """
+    Background task at API startup: move legacy inline texts to audit_texts, then
+    index logs the full-text index doesn't cover yet. Both resume at next startup.
+    """
+    db = SessionLocal()
+    try:
+        for step in (migrate_inline_texts, backfill_search_index):
+            while step(db):
+                pass
+    except Exception as e:
+        db.rollback()
+        print(f"Audit text catch-up stopped: {e}")
+    finally:
+        db.close()
+
+
+# ==========================
+# Full-Text Search
+# ==========================
+
+SEARCH_SNIPPET_CHARS = 160
+
+
+def search_supported(db: Session) -> bool:
+    return db.get_bind().dialect.name in ("sqlite", "postgresql")
+
+
+def index_logs(db: Session, entries):
+    """Add (log_id, text) pairs to the full-text index, without committing"""
+    if not entries or not search_supported(db):
+        return
+    params = [{"id": log_id, "body": body or ""} for log_id, body in entries]
+    if db.get_bind().dialect.name == "sqlite":
+        db.execute(text(f"INSERT INTO {SEARCH_TABLE} (rowid, body) VALUES (:id, :body)"), params)
+    else:
+        db.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (log_id, document) VALUES (:id, to_tsvector('simple', :body)) "
+            "ON CONFLICT (log_id) DO NOTHING"
+        ), params)
+
+
+def index_logs_after(db: Session, last_id: Optional[int], bodies: Dict[str, str]):
+    """Index logs inserted after id last_id (writes that returned no ids); bodies maps digest -> text"""
+    if not search_supported(db):
+        return
+    logs = db.execute(
+        select(AuditLog.id, AuditLog.text_digest, AuditLog.extracted_text).where(AuditLog.id > (last_id or 0))
+    ).all()
+    missing = [log for log in logs if log.text_digest not in bodies]
+    loaded = load_texts(db, missing) if missing else {}
+    index_logs(db, [(log.id, bodies[log.text_digest] if log.text_digest in bodies else loaded[log.id]) for log in logs])
+
+
+def unindex_log(db: Session, log_id: int, body: Optional[str]):
+    """Remove a log from the full-text index (FTS5 needs the indexed text to delete it)"""
+    if not search_supported(db):
+        return
+    if db.get_bind().dialect.name == "sqlite":
+        if db.scalar(text(f"SELECT rowid FROM {SEARCH_TABLE} WHERE rowid = :id"), {"id": log_id}) is None:
+            return  # Not indexed yet (backfill still running); 'delete' of a missing row corrupts the index
+        db.execute(
+            text(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, body) VALUES ('delete', :id, :body)"),
+            {"id": log_id, "body": body or ""}
+        )
+    else:
+        db.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE log_id = :id"), {"id": log_id})
+
+
+def backfill_search_index(db: Session, chunk_rows: int = 500) -> int:
+    """
+    Index one chunk of logs older than the oldest indexed one, newest first, and
+    commit; returns rows indexed. Indexed ids always form every id from the
+    oldest indexed upwards, so that id is the resume point.
+    """
+    if not search_supported(db):
+        return 0
+    key = "rowid" if db.get_bind().dialect.name == "sqlite" else "log_id"
+    oldest = db.scalar(text(f"SELECT min({key}) FROM {SEARCH_TABLE}"))
+    query = select(AuditLog.id, AuditLog.text_digest, AuditLog.extracted_text)
+    if oldest is not None:
+        query = query.where(AuditLog.id < oldest)
+    logs = db.execute(query.order_by(AuditLog.id.desc()).limit(chunk_rows)).all()
+    if not logs:
+        return 0
+    texts = load_texts(db, logs)
+    index_logs(db, [(log.id, texts[log.id]) for log in logs])
+    db.commit()
+    return len(logs)
+
+
+def search_query_terms(query: str) -> List[str]:
+    return re.findall(r"\S+", query)
+
+
+def _search_sql(db: Session, query: str, compliance_status, user_id, start, end):
+    """(score expression, FROM ... WHERE ... clause, params) for a search"""
+    terms = search_query_terms(query)
+    params = {}
+    filters = ""
+    if compliance_status:
+        filters += " AND audit_logs.compliance_status = :compliance_status"
+        params["compliance_status"] = compliance_status
+    if user_id is not None:
+        filters += " AND audit_logs.user_id = :user_id"
+        params["user_id"] = user_id
+    if start is not None:
+        filters += " AND audit_logs.timestamp >= :start"
+        params["start"] = start
+    if end is not None:
+        filters += " AND audit_logs.timestamp <= :end"
+        params["end"] = end
+
+    if db.get_bind().dialect.name == "sqlite":
+        # Each term as an FTS5 phrase, so user input is never parsed as query syntax
+        params["match"] = " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        return f"-bm25({SEARCH_TABLE})", (
+            f"FROM {SEARCH_TABLE} JOIN audit_logs ON audit_logs.id = {SEARCH_TABLE}.rowid "
+            f"WHERE {SEARCH_TABLE} MATCH :match{filters}"
+        ), params
+    params["query"] = " ".join(terms)
+    return "ts_rank(s.document, q)", (
+        f"FROM {SEARCH_TABLE} s JOIN audit_logs ON audit_logs.id = s.log_id, plainto_tsquery('simple', :query) q "
+        f"WHERE s.document @@ q{filters}"
+    ), params
+
+
+def search_logs(db: Session, query: str, limit: int, offset: int, compliance_status=None, user_id=None,
+                start=None, end=None):
+    """
+    Audit-log ids matching every term of `query` (terms may contain punctuation,
+    e.g. 1800-000-000), best match first: [(id, score)], higher score is better.
+    """
+    score, clause, params = _search_sql(db, query, compliance_status, user_id, start, end)
+    sql = f"SELECT audit_logs.id, {score} AS score {clause} ORDER BY score DESC, audit_logs.id DESC LIMIT :limit OFFSET :offset"
+    return [(row.id, row.score) for row in db.execute(_typed(text(sql), params), {**params, "limit": limit, "offset": offset})]
+
+
+def count_search_matches(db: Session, query: str, compliance_status=None, user_id=None, start=None, end=None) -> int:
+    _, clause, params = _search_sql(db, query, compliance_status, user_id, start, end)
+    return db.scalar(_typed(text(f"SELECT count(*) {clause}"), params), params)
+
+
+def _typed(statement, params):
+    """Bind time filters as DateTime, so they compare like the stored column"""
+    return statement.bindparams(*[bindparam(name, type_=DateTime()) for name in ("start", "end") if name in params])
+
+
+def search_snippet(body: Optional[str], query: str) -> str:
+    """Up to SEARCH_SNIPPET_CHARS of text around the first matched term"""
+    body = " ".join((body or "").split())
+    lowered = body.lower()
+    positions = [lowered.find(term.lower()) for term in search_query_terms(query)]
+    positions = [position for position in positions if position >= 0]
+    start = max(0, min(positions, default=0) - SEARCH_SNIPPET_CHARS // 3)
+    snippet = body[start:start + SEARCH_SNIPPET_CHARS]
+    return ("..." if start > 0 else "") + snippet + ("..." if start + SEARCH_SNIPPET_CHARS < len(body) else "")
@@ -0,0 +1,545 @@
+"""
+Batch Worker Pool
+Durable batch jobs: items are claimed atomically from the batch_items table and
+OCR'd in worker processes, so every image is processed exactly once.
+
+Worker processes only compute, BATCH_OCR_GROUP_SIZE items per task with one
+Tesseract run for the whole group. The dispatcher collects their results and
+persists them in groups: one bulk audit-log insert, one bulk item update and
+one commit per flush, instead of a commit per image.
+
+Every finished item is checkpointed in the database, and a claim is a lease the
+dispatcher keeps renewing while the item is in flight. If a dispatcher dies
+(restart, crash, redeploy), its leases lapse and any dispatcher - including the
+restarted one, at startup - puts those items back to pending. Completed items
+are never reprocessed.
+
+The API starts an embedded pool with BATCH_WORKER_CONCURRENCY processes.
+Set it to 0 to run the workers on their own instead:
+
+    python batch_worker.py --concurrency 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+import numpy as np
+from PIL import Image
+from sqlalchemy import func, update
+
+from audit_store import write_audit_logs
+from database import SessionLocal, BatchJob, BatchItem, init_db
+from ocr_pipeline import process_label_image, process_label_images
+
+# Worker processes for batch OCR (0 disables the pool embedded in the API)
+BATCH_WORKER_CONCURRENCY = int(os.getenv("BATCH_WORKER_CONCURRENCY", "2"))
+
+# How often an idle dispatcher looks for work queued by other API processes
+BATCH_POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "2"))
+
+# Finished items are persisted once this many are waiting, or the oldest has waited this long
+BATCH_FLUSH_ROWS = int(os.getenv("BATCH_FLUSH_ROWS", "32"))
+BATCH_FLUSH_SECONDS = float(os.getenv("BATCH_FLUSH_SECONDS", "1.0"))
+
+# Items OCR'd together in one Tesseract run (one worker task)
+BATCH_OCR_GROUP_SIZE = int(os.getenv("BATCH_OCR_GROUP_SIZE", "8"))
+
+# A claim not renewed for this long is considered abandoned and requeued
+BATCH_LEASE_SECONDS = float(os.getenv("BATCH_LEASE_SECONDS", "60"))
+
+# Items abandoned this many times (e.g. an image that kills its worker) are failed instead
+BATCH_MAX_ATTEMPTS = int(os.getenv("BATCH_MAX_ATTEMPTS", "3"))
+
+
+def scan_batch_items(file_paths, lang_config: str):
+    """
+    Worker-process side: OCR a group of spooled images (no database access).
+    Returns one {"scan": ...} or {"error": ...} per path, in order. If the grouped
+    run fails, each image is retried on its own so one bad file fails alone.
+    """
+    outcomes = [None] * len(file_paths)
+    images = []
+    for i, file_path in enumerate(file_paths):
+        try:
+            images.append((i, np.array(Image.open(file_path))))
+        except Exception as e:
+            outcomes[i] = {"error": str(e)}
+
+    try:
+        scans = process_label_images([image for _, image in images], lang_config)
+        for (i, _), scan in zip(images, scans):
+            outcomes[i] = {"scan": scan}
+    except Exception:
+        for i, image in images:
+            try:
+                outcomes[i] = {"scan": process_label_image(image, lang_config)}
+            except Exception as e:
+                outcomes[i] = {"error": getattr(e, "detail", None) or str(e)}
+    return outcomes
+
+
+def fair_candidates(db, limit: int, after_user=None):
+    """
+    Up to `limit` pending items, taken round-robin across users (each user's
+    oldest item first), starting with the first user after `after_user`.
+    A user with a large job can't hold everyone else's items back.
+    One query loads each user's oldest `limit` pending items; the round-robin
+    is done here.
+    """
+    rank = func.row_number().over(partition_by=BatchJob.user_id, order_by=BatchItem.id).label("rank")
+    pending = db.query(BatchItem.id, BatchJob.user_id, rank).join(
+        BatchJob, BatchJob.id == BatchItem.job_id
+    ).filter(BatchItem.status == "pending").subquery()
+    rows = db.query(BatchItem, BatchJob).join(
+        pending, pending.c.id == BatchItem.id
+    ).join(
+        BatchJob, BatchJob.id == BatchItem.job_id
+    ).filter(pending.c.rank <= limit).order_by(BatchItem.id).all()
+
+    by_user = defaultdict(list)
+    for item, job in rows:
+        by_user[job.user_id].append((item, job))
+    users = sorted(by_user)
+    if after_user is not None:
+        users = [u for u in users if u > after_user] + [u for u in users if u <= after_user]
+
+    candidates = []
+    for round_index in range(max(map(len, by_user.values()), default=0)):
+        for user_id in users:
+            if len(candidates) == limit:
+                return candidates
+            if round_index < len(by_user[user_id]):
+                candidates.append(by_user[user_id][round_index])
+    return candidates
+
+
+def claim_items(db, worker_id: str, limit: int, after_user=None):
+    """
+    Move up to `limit` pending items to 'processing' for this worker, fairly across users.
+    The conditional UPDATE is the claim: when two dispatchers race for an item,
+    only one of them sees rowcount == 1.
+    Returns one dict per claimed item with what the worker and the flush need.
+    """
+    candidates = fair_candidates(db, limit, after_user)
+
+    now = datetime.utcnow()
+    claimed = []
+    for item, job in candidates:
+        result = db.execute(
+            update(BatchItem)
+            .where(BatchItem.id == item.id, BatchItem.status == "pending")
+            .values(status="processing", claimed_by=worker_id, claimed_at=now, attempts=BatchItem.attempts + 1)
+        )
+        if result.rowcount == 1:
+            claimed.append({
+                "item_id": item.id,
+                "job_id": job.id,
+                "filename": item.filename,
+                "file_path": item.file_path,
+                "lang_config": 'eng+tam' if job.tamil_support else 'eng',
+                "user_id": job.user_id,
+                "username": job.username
+            })
+            db.execute(
+                update(BatchJob)
+                .where(BatchJob.id == job.id, BatchJob.status == "queued")
+                .values(status="running", started_at=now)
+            )
+    db.commit()
+    return claimed
+
+
+def audit_log_row(claim: dict) -> dict:
+    scan = claim["scan"]
+    return {
+        "filename": claim["filename"],
+        "user_id": claim["user_id"],
+        "username": claim["username"],
+        "extracted_text": scan["extracted_text"],
+        "compliance_status": scan["compliance_status"],
+        "confidence_score": scan["confidence_score"],
+        "missing_keywords": ",".join(scan["missing_keywords"]),
+        "expiry_status": str(scan["expiry_info"]) if scan["expiry_info"] else None,
+        "image_quality": scan["image_quality"]["quality"],
+        "blur_variance": scan["image_quality"]["variance"],
+        "processing_time_ms": scan["processing_time_ms"]
+    }
+
+
+def item_result(scan: dict) -> str:
+    """JSON summary kept on the batch item for the results endpoint"""
+    return json.dumps({
+        "compliance_status": scan["compliance_status"],
+        "confidence_score": scan["confidence_score"],
+        "needs_manual_review": scan["needs_manual_review"],
+        "missing_keywords": scan["missing_keywords"],
+        "image_quality": scan["image_quality"]["quality"],
+        "sharp_ratio": scan["blur_map"]["sharp_ratio"],
+        "retake_regions": scan["blur_map"]["retake_regions"],
+        "processing_time_ms": scan["processing_time_ms"]
+    })
+
+
+def flush_results(db, worker_id: str, finished):
+    """
+    Persist a group of finished items in one transaction: audit logs (bulk insert),
+    item states (bulk update by primary key) and job counters and throughput.
+    Items whose claim this worker no longer holds are dropped, not double-written.
+    Returns the claims that were settled.
+    """
+    start = time.perf_counter()
+
+    owned = {
+        item_id for (item_id,) in db.query(BatchItem.id).filter(
+            BatchItem.id.in_([claim["item_id"] for claim in finished]),
+            BatchItem.status == "processing",
+            BatchItem.claimed_by == worker_id
+        ).with_for_update()
+    }
+    finished = [claim for claim in finished if claim["item_id"] in owned]
+    succeeded = [claim for claim in finished if "scan" in claim]
+
+    audit_log_ids = write_audit_logs(db, [audit_log_row(claim) for claim in succeeded])
+
+    now = datetime.utcnow()
+    updates = []
+    for claim, audit_log_id in zip(succeeded, audit_log_ids):
+        updates.append({
+            "id": claim["item_id"],
+            "status": "completed",
+            "audit_log_id": audit_log_id,
+            "result": item_result(claim["scan"]),
+            "finished_at": now
+        })
+    for claim in finished:
+        if "scan" not in claim:
+            updates.append({"id": claim["item_id"], "status": "failed", "error": claim["error"], "finished_at": now})
+    if updates:
+        db.execute(update(BatchItem), updates)
+
+    per_job = defaultdict(lambda: {"completed": 0, "failed": 0})
+    for claim in finished:
+        per_job[claim["job_id"]]["completed" if "scan" in claim else "failed"] += 1
+
+    # Share of this flush's write time, by rows written, for each job's rows/sec figure
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    for job_id, counts in per_job.items():
+        update_job_counters(
+            db, job_id, counts["completed"], counts["failed"], now,
+            write_ms=elapsed_ms * counts["completed"] / max(1, len(succeeded))
+        )
+    db.commit()
+    return finished
+
+
+def update_job_counters(db, job_id: int, completed: int, failed: int, now: datetime, write_ms: float = 0.0):
+    """Add settled items to a job's counters and mark it completed once every item is settled"""
+    db.execute(
+        update(BatchJob).where(BatchJob.id == job_id).values(
+            completed_items=BatchJob.completed_items + completed,
+            failed_items=BatchJob.failed_items + failed,
+            db_rows_written=BatchJob.db_rows_written + completed,
+            db_write_ms=BatchJob.db_write_ms + write_ms
+        )
+    )
+    db.execute(
+        update(BatchJob)
+        .where(
+            BatchJob.id == job_id,
+            BatchJob.status != "completed",
+            BatchJob.completed_items + BatchJob.failed_items >= BatchJob.total_items
+        )
+        .values(status="completed", finished_at=now)
+    )
+
+
+def renew_claims(db, worker_id: str, item_ids):
+    """Extend this worker's lease on items it is still working on"""
+    if item_ids:
+        db.execute(
+            update(BatchItem)
+            .where(BatchItem.id.in_(item_ids), BatchItem.status == "processing", BatchItem.claimed_by == worker_id)
+            .values(claimed_at=datetime.utcnow())
+        )
+    db.commit()
+
+
+def release_claims(db, worker_id: str, item_ids):
+    """Hand unfinished items back to the queue on shutdown (the attempt is not counted)"""
+    if item_ids:
+        db.execute(
+            update(BatchItem)
+            .where(BatchItem.id.in_(item_ids), BatchItem.status == "processing", BatchItem.claimed_by == worker_id)
+            .values(status="pending", claimed_by=None, claimed_at=None, attempts=BatchItem.attempts - 1)
+        )
+    db.commit()
+
+
+def requeue_stale_items(db, lease_seconds: float = BATCH_LEASE_SECONDS, max_attempts: int = BATCH_MAX_ATTEMPTS):
+    """
+    Put items whose lease lapsed (their dispatcher died) back to pending, or fail
+    them once they have used up max_attempts. Completed items are untouched.
+    Returns (requeued, failed) counts.
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=lease_seconds)
+    stale = db.query(BatchItem.id, BatchItem.job_id, BatchItem.attempts).filter(
+        BatchItem.status == "processing",
+        BatchItem.claimed_at < cutoff
+    ).all()
+
+    requeued = 0
+    failed_per_job = defaultdict(int)
+    for item_id, job_id, attempts in stale:
+        exhausted = attempts >= max_attempts
+        values = {"status": "failed", "error": f"Abandoned after {attempts} attempts", "finished_at": now} \
+            if exhausted else {"status": "pending"}
+        # Conditional on the lapsed lease, so an item renewed in the meantime keeps its worker
+        result = db.execute(
+            update(BatchItem)
+            .where(BatchItem.id == item_id, BatchItem.status == "processing", BatchItem.claimed_at < cutoff)
+            .values(claimed_by=None, claimed_at=None, **values)
+        )
+        if result.rowcount == 1:
+            if exhausted:
+                failed_per_job[job_id] += 1
+            else:
+                requeued += 1
+
+    for job_id, failed in failed_per_job.items():
+        update_job_counters(db, job_id, 0, failed, now)
+    db.commit()
+    return requeued, sum(failed_per_job.values())
+
+
+class BatchWorkerPool:
+    """
+    Dispatcher thread that claims pending items, hands them to a process pool in
+    groups of `group_size` (at most `concurrency` groups in flight) and flushes
+    finished items in groups.
+    With a scheduler (the API's OCRScheduler), a group is only dispatched when
+    the scheduler grants a batch slot, so interactive scans go first.
+    """
+
+    # On shutdown, in-flight items get this long to finish and be persisted
+    SHUTDOWN_GRACE_SECONDS = 20
+
+    def __init__(self, concurrency: int = BATCH_WORKER_CONCURRENCY, poll_seconds: float = BATCH_POLL_SECONDS,
+                 flush_rows: int = BATCH_FLUSH_ROWS, flush_seconds: float = BATCH_FLUSH_SECONDS,
+                 lease_seconds: float = BATCH_LEASE_SECONDS, scheduler=None,
+                 group_size: int = BATCH_OCR_GROUP_SIZE):
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.lease_seconds = lease_seconds
+        self.group_size = max(1, group_size)
+        self.scheduler = scheduler
+        if scheduler is not None:
+            scheduler.subscribe(self.notify)
+        self._last_user = None  # Round-robin position across users
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+        self._broken = False
+
+    def _new_executor(self):
+        # Spawned (not forked) workers: the parent runs threads and holds pooled DB connections
+        return ProcessPoolExecutor(max_workers=self.concurrency, mp_context=multiprocessing.get_context("spawn"))
+
+    def start(self):
+        self._executor = self._new_executor()
+        self._thread = threading.Thread(target=self.run, name="batch-dispatcher", daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        """Wake the dispatcher, e.g. right after a job is queued"""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _flush(self, finished):
+        """Persist finished items; on failure keep them for the next attempt"""
+        db = SessionLocal()
+        try:
+            settled = flush_results(db, self.worker_id, finished)
+        except Exception:
+            db.rollback()
+            traceback.print_exc()
+            return finished
+        finally:
+            db.close()
+
+        # Settled items no longer need their spooled upload
+        for claim in settled:
+            if claim["file_path"] and os.path.exists(claim["file_path"]):
+                os.remove(claim["file_path"])
+        return []
+
+    def _maintain_leases(self, in_flight, finished):
+        """Renew this dispatcher's leases, then requeue items whose leases lapsed elsewhere"""
+        db = SessionLocal()
+        try:
+            renew_claims(db, self.worker_id, [claim["item_id"] for claim in self._in_flight_claims(in_flight) + finished])
+            requeued, failed = requeue_stale_items(db, self.lease_seconds)
+            if requeued or failed:
+                print(f"Batch recovery: requeued {requeued} abandoned items, failed {failed}")
+        except Exception:
+            db.rollback()
+            traceback.print_exc()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _in_flight_claims(in_flight):
+        return [claim for group in in_flight.values() for claim in group]
+
+    def _submit(self, claimed, in_flight, max_groups: int):
+        """
+        Submit claims as up to max_groups groups of at most group_size items
+        sharing a language. Returns the claims that didn't fit.
+        """
+        by_lang = defaultdict(list)
+        for claim in claimed:
+            by_lang[claim["lang_config"]].append(claim)
+        groups = [
+            (lang_config, claims[start:start + self.group_size])
+            for lang_config, claims in by_lang.items()
+            for start in range(0, len(claims), self.group_size)
+        ]
+        for lang_config, group in groups[:max_groups]:
+            future = self._executor.submit(scan_batch_items, [claim["file_path"] for claim in group], lang_config)
+            future.add_done_callback(lambda _: self._wake.set())
+            in_flight[future] = group
+        return [claim for _, group in groups[max_groups:] for claim in group]
+
+    def _collect(self, in_flight, finished):
+        """Move completed futures' results into `finished`"""
+        for future in [future for future in in_flight if future.done()]:
+            group = in_flight.pop(future)
+            if self.scheduler is not None:
+                self.scheduler.release("batch")
+            try:
+                for claim, outcome in zip(group, future.result()):
+                    claim.update(outcome)
+            except BrokenProcessPool:
+                for claim in group:
+                    claim["error"] = "Worker process died"
+                self._broken = True
+            except Exception as e:
+                for claim in group:
+                    claim["error"] = str(e)
+            finished.extend(group)
+
+    def run(self):
+        in_flight = {}
+        finished = []
+        oldest = None  # When the oldest unflushed result arrived
+        next_lease_check = 0.0  # Immediately: recover what a previous run left behind
+
+        while not self._stop.is_set():
+            if time.monotonic() >= next_lease_check:
+                self._maintain_leases(in_flight, finished)
+                next_lease_check = time.monotonic() + self.lease_seconds / 3
+
+            self._collect(in_flight, finished)
+            if self._broken and not in_flight:
+                self._executor.shutdown(wait=False)
+                self._executor = self._new_executor()
+                self._broken = False
+
+            if finished:
+                oldest = oldest or time.monotonic()
+                if len(finished) >= self.flush_rows or not in_flight or \
+                        time.monotonic() - oldest >= self.flush_seconds:
+                    finished = self._flush(finished)
+                    oldest = time.monotonic() if finished else None
+
+            claimed = []
+            free = self.concurrency - len(in_flight)
+            if free > 0 and not self._broken:
+                if self.scheduler is not None:
+                    free = self.scheduler.try_acquire("batch", free)
+                if free > 0:
+                    db = SessionLocal()
+                    try:
+                        claimed = claim_items(db, self.worker_id, free * self.group_size, self._last_user)
+                    except Exception:
+                        traceback.print_exc()
+                    finally:
+                        db.close()
+                    if claimed:
+                        self._last_user = claimed[-1]["user_id"]
+
+                    groups_before = len(in_flight)
+                    leftover = self._submit(claimed, in_flight, free)
+                    if leftover:
+                        # Mixed languages made more groups than slots; requeue the rest
+                        db = SessionLocal()
+                        try:
+                            release_claims(db, self.worker_id, [claim["item_id"] for claim in leftover])
+                        except Exception:
+                            traceback.print_exc()  # Their leases lapse instead
+                        finally:
+                            db.close()
+                    if self.scheduler is not None:
+                        self.scheduler.release("batch", free - (len(in_flight) - groups_before), used=False)
+
+            if not claimed:
+                timeout = min(self.poll_seconds, self.flush_seconds) if finished else self.poll_seconds
+                self._wake.wait(min(timeout, max(0.0, next_lease_check - time.monotonic())))
+                self._wake.clear()
+
+        # Let in-flight items finish and persist them; stragglers go back to the queue
+        if in_flight:
+            wait(list(in_flight), timeout=self.SHUTDOWN_GRACE_SECONDS)
+        self._collect(in_flight, finished)
+        if finished:
+            finished = self._flush(finished)
+        unfinished = [claim["item_id"] for claim in self._in_flight_claims(in_flight) + finished]
+        if unfinished:
+            db = SessionLocal()
+            try:
+                release_claims(db, self.worker_id, unfinished)
+            except Exception:
+                traceback.print_exc()  # Their leases lapse instead
+            finally:
+                db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run batch OCR workers outside the API process")
+    parser.add_argument('--concurrency', type=int, default=max(1, BATCH_WORKER_CONCURRENCY))
+    args = parser.parse_args()
+
+    init_db()
+    pool = BatchWorkerPool(args.concurrency)
+    print(f"Batch workers started ({args.concurrency} processes, id {pool.worker_id})")
+    pool.start()
+    try:
+        pool._thread.join()
+    except KeyboardInterrupt:
+        print("Stopping batch workers...")
+        pool.stop()
+
+
+if __name__ == '__main__':
+    main()
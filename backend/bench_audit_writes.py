@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark: audit-log persistence
+Compares one commit per row (the old scan path) with write_audit_logs flushing
+many rows per transaction, against DATABASE_URL (use a scratch database).
+
+Usage: DATABASE_URL=sqlite:///./bench.db python bench_audit_writes.py [--rows 2000] [--flush 32]
+"""
+
+import argparse
+import time
+
+from audit_store import write_audit_logs
+from database import SessionLocal, AuditLog, init_db
+
+
+def make_row(i):
+    return {
+        'filename': f"label{i}.jpg",
+        'user_id': 1,
+        'username': 'bench',
+        'extracted_text': "MRP Rs 99.00 Net Wt 500 g Mfg Date 01/2026 Customer Care 1800-000-000 Made in India",
+        'compliance_status': 'COMPLIANT' if i % 3 else 'NON_COMPLIANT',
+        'confidence_score': 80.0 + i % 20,
+        'missing_keywords': '' if i % 3 else 'Customer Care',
+        'image_quality': 'Good',
+        'blur_variance': 250.0,
+        'processing_time_ms': 1200.0,
+    }
+
+
+def per_row_commits(rows):
+    db = SessionLocal()
+    try:
+        for row in rows:
+            db.add(AuditLog(**row))
+            db.commit()
+    finally:
+        db.close()
+
+
+def bulk_flushes(rows, flush, return_ids):
+    db = SessionLocal()
+    try:
+        for start in range(0, len(rows), flush):
+            write_audit_logs(db, rows[start:start + flush], return_ids=return_ids)
+            db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--flush', type=int, default=32, help='rows per transaction for the bulk path')
+    args = parser.parse_args()
+
+    init_db()
+    rows = [make_row(i) for i in range(args.rows)]
+    scenarios = [
+        ('one commit per row', lambda: per_row_commits(rows)),
+        (f'write_audit_logs x{args.flush}, ids', lambda: bulk_flushes(rows, args.flush, True)),
+        (f'write_audit_logs x{args.flush}, no ids', lambda: bulk_flushes(rows, args.flush, False)),
+        ('write_audit_logs, one transaction', lambda: bulk_flushes(rows, len(rows), False)),
+    ]
+
+    print(f"{'path':36} {'seconds':>9} {'rows/sec':>10}")
+    print('-' * 57)
+    for label, run in scenarios:
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{label:36} {elapsed:9.2f} {args.rows / elapsed:10.0f}")
+
+
+if __name__ == '__main__':
+    main()
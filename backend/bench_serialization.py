@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark: JSON serialization and compression of smart-scan payloads
+Compares stdlib json (Starlette's JSONResponse) with orjson, and gzip with brotli,
+on synthetic smart-scan responses shaped like the real ones.
+
+Usage: python bench_serialization.py [--repeat 20]
+"""
+
+import argparse
+import gzip
+import json
+import time
+
+import cv2
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from smart_auditor import ImageEncoder
+
+
+def make_label_photo(width=3000, height=4000, seed=7):
+    """Photo-like label: textured background, printed text, sensor noise"""
+    rng = np.random.default_rng(seed)
+    image = cv2.GaussianBlur(rng.integers(180, 255, (height, width, 3), dtype=np.uint8), (0, 0), 6)
+    for row in range(60):
+        y = 120 + row * 60
+        cv2.putText(image, f"MRP Rs {row * 7}.00  Net Wt 500 g  Batch B{row:04d}", (80, y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.6, (20, 20, 20), 3)
+    noise = rng.normal(0, 6, image.shape)
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+def make_payload(image, image_format, max_dimension, words=600):
+    """Smart-scan response with two encoded images and per-word coordinates"""
+    encoded = ImageEncoder.encode_base64(image, image_format, ImageEncoder.DEFAULT_QUALITY, max_dimension)
+    items = [
+        {'text': f"word{i}", 'confidence': 60 + i % 40, 'x': (i * 37) % 2900, 'y': (i * 53) % 3900, 'w': 80, 'h': 30}
+        for i in range(words)
+    ]
+    return {
+        'extracted_text': ' '.join(item['text'] for item in items),
+        'processed_image': encoded,
+        'visual_analysis_image': encoded,
+        'compliance_results': [
+            {'field': 'MRP', 'detected_text': 'MRP', 'confidence': 95, 'status': 'FOUND'}
+        ] * 5,
+        'pii_detected': [],
+        'tamper_alert': False,
+        'tamper_score': 0.02,
+        'tamper_reason': 'No tampering detected',
+        'compliance_status': 'COMPLIANT',
+        'confidence_score': 92.0,
+        'coordinates_data': {'text': '', 'items': items, 'width': 3000, 'height': 4000},
+        'processing_time_ms': 3120.5,
+    }
+
+
+def stdlib_dumps(content):
+    """Same settings as Starlette's JSONResponse.render"""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def timed(fn, repeat):
+    """Best-of-N wall time in milliseconds, and the last result"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    image = make_label_photo()
+    scenarios = [
+        ('legacy png, full resolution', 'png', 0),
+        ('default jpeg q70, 1024 px', ImageEncoder.DEFAULT_FORMAT, ImageEncoder.DEFAULT_MAX_DIMENSION),
+        ('coordinates only (none)', 'none', 0),
+    ]
+
+    print(f"{'payload':32} {'size':>10} {'json':>9} {'orjson':>9} {'gzip-6':>18} {'br-4':>18}")
+    print('-' * 100)
+    for label, image_format, max_dimension in scenarios:
+        payload = make_payload(image, image_format, max_dimension)
+
+        json_ms, body = timed(lambda: stdlib_dumps(payload), args.repeat)
+        orjson_ms = timed(lambda: orjson.dumps(payload), args.repeat)[0] if orjson else float('nan')
+
+        gzip_ms, gz = timed(lambda: gzip.compress(body, 6), max(1, args.repeat // 4))
+        gzip_col = f"{len(gz) / 1024:8.0f}K {gzip_ms:6.1f}ms"
+        if brotli:
+            br_ms, br = timed(lambda: brotli.compress(body, quality=4), max(1, args.repeat // 4))
+            br_col = f"{len(br) / 1024:8.0f}K {br_ms:6.1f}ms"
+        else:
+            br_col = 'n/a'
+
+        print(f"{label:32} {len(body) / 1024:9.0f}K {json_ms:7.2f}ms {orjson_ms:7.2f}ms {gzip_col:>18} {br_col:>18}")
+
+
+if __name__ == '__main__':
+    main()
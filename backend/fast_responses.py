@@ -0,0 +1,172 @@
+"""
+Fast JSON Serialization and Response Compression
+orjson-backed JSON responses plus negotiated brotli/gzip compression for large payloads
+(smart-scan images, coordinates_data, audit-log listings)
+"""
+
+import zlib
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (numpy arrays and non-str keys allowed)"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick 'br' or 'gzip' from an Accept-Encoding header, honouring q=0"""
+    offered = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        offered[token] = q
+
+    wildcard = offered.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = None
+    best_q = 0.0
+    for encoding in candidates:
+        q = offered.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Compressor:
+    """Incremental brotli or gzip stream"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._br.process(data)
+            return out + (self._br.finish() if final else self._br.flush())
+        out = self._gz.compress(data)
+        return out + self._gz.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses above minimum_size with brotli or gzip,
+    whichever the client prefers. Streaming bodies are compressed chunk by chunk
+    with a sync flush, so NDJSON progress events are not held back.
+    """
+
+    # Already compressed, or must reach the client unbuffered
+    EXCLUDED_MEDIA_TYPES = (
+        "text/event-stream",
+        "image/",
+        "application/pdf",
+        "application/zip",
+        "application/gzip",
+        "application/vnd.apache.parquet",
+        "application/octet-stream",
+    )
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                if start_message is not None and compressor is None and not passthrough:
+                    # No body to decide on (e.g. http.response.pathsend): the start goes out as is, first
+                    passthrough = True
+                    await send(start_message)
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if passthrough:
+                await send(message)
+                return
+
+            if compressor is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                content_type = headers.get("content-type", "")
+                skip = (
+                    "content-encoding" in headers
+                    or start_message["status"] in (204, 206, 304)
+                    or content_type.startswith(self.EXCLUDED_MEDIA_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                )
+                if skip:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                compressed = compressor.compress(body, final=not more_body)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["content-length"]
+                else:
+                    headers["Content-Length"] = str(len(compressed))
+                await send(start_message)
+                await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+                return
+
+            await send({
+                "type": "http.response.body",
+                "body": compressor.compress(body, final=not more_body),
+                "more_body": more_body,
+            })
+
+        await self.app(scope, receive, send_wrapper)
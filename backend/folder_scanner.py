@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Offline Folder Scanner
+Audits a directory tree of label photos with the backend OCR pipeline, without
+the API or a database. Images are fanned out to a process pool and each result
+is appended to a CSV or JSONL report as soon as it is ready.
+
+Results are keyed by SHA-256 of the image bytes: re-running with the same
+output file skips images already recorded there, so an interrupted run resumes
+where it stopped (failed images are retried). A record the interrupted run only
+half wrote is truncated away before new rows are appended.
+
+Usage:
+    python folder_scanner.py /data/labels --output report.csv --workers 8
+    python folder_scanner.py /data/labels --output report.jsonl --tamil
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from PIL import Image
+
+from image_types import IMAGE_EXTENSIONS
+from ocr_pipeline import process_label_image
+
+REPORT_COLUMNS = [
+    "sha256", "path", "compliance_status", "confidence_score", "needs_manual_review",
+    "missing_keywords", "found_keywords", "expiry_date", "image_quality", "blur_variance",
+    "sharp_ratio", "processing_time_ms", "error", "extracted_text"
+]
+
+# Files queued per worker process; keeps memory flat on very large trees
+QUEUE_PER_WORKER = 4
+
+# Seconds between progress line updates
+PROGRESS_INTERVAL = 0.5
+
+_done_hashes = frozenset()
+
+
+# ==========================
+# Worker Side
+# ==========================
+
+def init_worker(done_hashes):
+    global _done_hashes
+    _done_hashes = done_hashes
+    # One Tesseract thread per process; the pool already uses every core
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def scan_file(path: str, lang_config: str) -> dict:
+    """Hash and OCR one image; returns a report row (or None if already recorded)"""
+    with open(path, "rb") as f:
+        data = f.read()
+    sha256 = hashlib.sha256(data).hexdigest()
+    if sha256 in _done_hashes:
+        return None
+
+    row = {"sha256": sha256}
+    try:
+        scan = process_label_image(np.array(Image.open(io.BytesIO(data))), lang_config)
+    except Exception as e:
+        row.update({"compliance_status": "ERROR", "error": str(e)})
+        return row
+
+    row.update({
+        "compliance_status": scan["compliance_status"],
+        "confidence_score": scan["confidence_score"],
+        "needs_manual_review": scan["needs_manual_review"],
+        "missing_keywords": scan["missing_keywords"],
+        "found_keywords": scan["found_keywords"],
+        "expiry_date": scan["expiry_info"]["date_string"] if scan["expiry_info"] else None,
+        "image_quality": scan["image_quality"]["quality"],
+        "blur_variance": scan["image_quality"]["variance"],
+        "sharp_ratio": scan["blur_map"]["sharp_ratio"],
+        "processing_time_ms": round(scan["processing_time_ms"], 1),
+        "extracted_text": scan["extracted_text"]
+    })
+    return row
+
+
+# ==========================
+# Report Files
+# ==========================
+
+class ReportWriter:
+    """Appends rows to a CSV or JSONL report, flushing after every row"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.format = "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+        self._file = None
+        self._csv = None
+        self._complete_bytes = None
+
+    def _records(self):
+        """
+        (record, end offset) for each complete record of an existing report. A
+        CSV record ends at a newline outside quotes, so quoted multi-line text
+        stays one record; a record cut short by an interrupted run is left out.
+        """
+        with open(self.path, "rb") as f:
+            lines = []
+            quotes = 0
+            offset = 0
+            for line in f:
+                offset += len(line)
+                lines.append(line)
+                if self.format == "csv":
+                    quotes += line.count(b'"')
+                if line.endswith(b"\n") and quotes % 2 == 0:
+                    yield b"".join(lines).decode("utf-8", errors="replace"), offset
+                    lines = []
+                    quotes = 0
+
+    def _scan(self):
+        """(hashes of images scanned successfully, bytes of complete records) of an existing report"""
+        if not os.path.exists(self.path):
+            return set(), 0
+        hashes = set()
+        complete_bytes = 0
+        header = None
+        for record, complete_bytes in self._records():
+            if self.format == "jsonl":
+                try:
+                    row = json.loads(record)
+                except ValueError:
+                    continue
+            else:
+                values = next(csv.reader(io.StringIO(record, newline="")), [])
+                if header is None:
+                    header = values
+                    continue
+                row = dict(zip(header, values))
+            if isinstance(row, dict) and row.get("sha256") and row.get("compliance_status") not in (None, "", "ERROR"):
+                hashes.add(row["sha256"])
+        return hashes, complete_bytes
+
+    def recorded_hashes(self):
+        """Hashes of images already scanned successfully in an existing report"""
+        hashes, self._complete_bytes = self._scan()
+        return hashes
+
+    def open(self):
+        if self._complete_bytes is None:
+            _, self._complete_bytes = self._scan()
+        if os.path.exists(self.path) and os.path.getsize(self.path) > self._complete_bytes:
+            # Drop what an interrupted run left after the last complete record
+            with open(self.path, "r+b") as f:
+                f.truncate(self._complete_bytes)
+        is_new = self._complete_bytes == 0
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        if self.format == "csv":
+            self._csv = csv.DictWriter(self._file, fieldnames=REPORT_COLUMNS, extrasaction="ignore")
+            if is_new:
+                self._csv.writeheader()
+
+    def write(self, row: dict):
+        if self.format == "jsonl":
+            self._file.write(json.dumps({column: row.get(column) for column in REPORT_COLUMNS}, ensure_ascii=False) + "\n")
+        else:
+            row = dict(row)
+            for column in ("missing_keywords", "found_keywords"):
+                if isinstance(row.get(column), list):
+                    row[column] = ";".join(row[column])
+            self._csv.writerow(row)
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+# ==========================
+# Scanner
+# ==========================
+
+def find_images(root: str):
+    """Image files under root (by extension), in a stable order"""
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for filename in sorted(filenames):
+            if not filename.startswith(".") and os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+                paths.append(os.path.join(dirpath, filename))
+    return paths
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m{seconds % 60:02d}s"
+
+
+class Progress:
+    """Single-line throughput / ETA display on stderr"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.scanned = 0
+        self.skipped = 0
+        self.failed = 0
+        self.start = time.monotonic()
+        self._last_draw = 0.0
+
+    def draw(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_draw < PROGRESS_INTERVAL:
+            return
+        self._last_draw = now
+        done = self.scanned + self.skipped + self.failed
+        elapsed = now - self.start
+        rate = self.scanned / elapsed if elapsed > 0 else 0.0
+        eta = format_duration((self.total - done) / rate) if rate > 0 else "--"
+        sys.stderr.write(
+            f"\r[{done}/{self.total}] {rate:.2f} img/s  ETA {eta}  "
+            f"(skipped {self.skipped}, failed {self.failed})   "
+        )
+        sys.stderr.flush()
+
+
+def scan_folder(root: str, output: str, workers: int, lang_config: str) -> Progress:
+    report = ReportWriter(output)
+    done_hashes = frozenset(report.recorded_hashes())
+    paths = find_images(root)
+    progress = Progress(len(paths))
+    print(f"Found {len(paths)} images under {root}; {len(done_hashes)} already in {output}", file=sys.stderr)
+
+    report.open()
+    seen = set(done_hashes)
+    pending = iter(paths)
+    in_flight = {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(done_hashes,)) as executor:
+            while True:
+                while len(in_flight) < workers * QUEUE_PER_WORKER:
+                    path = next(pending, None)
+                    if path is None:
+                        break
+                    in_flight[executor.submit(scan_file, path, lang_config)] = path
+                if not in_flight:
+                    break
+
+                finished, _ = wait(list(in_flight), timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    path = in_flight.pop(future)
+                    try:
+                        row = future.result()
+                    except Exception as e:  # Unreadable file
+                        row = {"sha256": None, "compliance_status": "ERROR", "error": str(e)}
+
+                    if row is None or (row["sha256"] in seen and row["compliance_status"] != "ERROR"):
+                        progress.skipped += 1  # Recorded before, or a duplicate of an image in this run
+                        continue
+                    row["path"] = os.path.relpath(path, root)
+                    report.write(row)
+                    if row["compliance_status"] == "ERROR":
+                        progress.failed += 1
+                    else:
+                        seen.add(row["sha256"])
+                        progress.scanned += 1
+                progress.draw()
+    finally:
+        report.close()
+        progress.draw(force=True)
+        sys.stderr.write("\n")
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Scan a folder of label images offline and write a compliance report (CSV or JSONL)"
+    )
+    parser.add_argument("folder", help="Directory to scan (recursively)")
+    parser.add_argument("--output", "-o", required=True, help="Report file; .jsonl/.ndjson for JSON Lines, otherwise CSV")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 1, help="OCR processes (default: CPU count)")
+    parser.add_argument("--tamil", action="store_true", help="OCR with English + Tamil")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.folder):
+        parser.error(f"not a directory: {args.folder}")
+
+    try:
+        progress = scan_folder(args.folder, args.output, max(1, args.workers), 'eng+tam' if args.tamil else 'eng')
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume.", file=sys.stderr)
+        sys.exit(130)
+
+    elapsed = time.monotonic() - progress.start
+    print(
+        f"Done in {format_duration(elapsed)}: {progress.scanned} scanned, "
+        f"{progress.skipped} skipped, {progress.failed} failed -> {args.output}",
+        file=sys.stderr
+    )
+
+
+if __name__ == '__main__':
+    main()
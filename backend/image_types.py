@@ -0,0 +1,7 @@
+"""
+Image File Types
+File extensions treated as label images when expanding archives and walking
+folders. No dependencies, so offline tools can import it without the API stack.
+"""
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff'}
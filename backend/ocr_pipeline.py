@@ -0,0 +1,425 @@
+"""
+OCR & Compliance Pipeline
+Tesseract OCR, blur analysis and mandatory-keyword checks shared by the API
+(main.py), the batch worker processes (batch_worker.py) and the offline folder
+scanner (folder_scanner.py), so it doesn't depend on the web framework
+"""
+
+import os
+import re
+import tempfile
+from datetime import datetime
+
+import cv2
+import numpy as np
+import pytesseract
+
+
+class OCRError(RuntimeError):
+    """Tesseract failed on an image; the API answers 500 with the message"""
+
+
+# Mandatory keywords for compliance
+MANDATORY_KEYWORDS = {
+    "MRP": {
+        "description": "Maximum Retail Price",
+        "keywords": ["MRP", "Maximum Retail Price", "Max Retail Price", "M.R.P", "M.R.P.", "Retail Price", "விலை", "அதிகபட்ச விலை"]
+    },
+    "Net Quantity": {
+        "description": "Net Quantity / Weight",
+        "keywords": ["Net Quantity", "Net Qty", "Net Wt", "Net Weight", "Net Wt.", "Net Content", "Nett Qty", "Weight", "Quantity", "எடை", "நிகர அளவு", "நிகர எடை"]
+    },
+    "Month and Year of Manufacture": {
+        "description": "Manufacturing Date",
+        "keywords": ["Month and Year of Manufacture", "Mfg Date", "Mfg.", "Manufacturing Date", "Manufactured", "Date of Manufacture", "MFD", "Manuf. Date", "தயாரிப்பு தேதி", "உற்பத்தி தேதி"]
+    },
+    "Customer Care": {
+        "description": "Customer Care / Contact Information",
+        "keywords": ["Customer Care", "Customer Service", "Consumer Care", "Contact", "Helpline", "Contact Us", "Customer Support", "Call Us", "வாடிக்கையாளர் சேவை", "தொடர்பு"]
+    },
+    "Country of Origin": {
+        "description": "Country of Origin",
+        "keywords": ["Country of Origin", "Made in", "Manufactured in", "Product of", "Origin", "Imported by", "Mfg. Country", "தயாரிப்பு நாடு", "உற்பத்தி நாடு"]
+    }
+}
+
+
+def preprocess_image(image_array):
+    """Pre-process image using OpenCV for better OCR accuracy"""
+    # Convert to grayscale
+    if len(image_array.shape) == 3:
+        gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
+    else:
+        gray = image_array
+    
+    # Apply adaptive thresholding
+    thresh = cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
+    )
+    
+    # Apply denoising
+    denoised = cv2.fastNlMeansDenoising(thresh, None, 10, 7, 21)
+    
+    return denoised
+
+
+def check_image_blur(image_array, threshold=100.0):
+    """Check image quality using Laplacian variance"""
+    if len(image_array.shape) == 3:
+        gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
+    else:
+        gray = image_array
+    
+    laplacian = cv2.Laplacian(gray, cv2.CV_64F)
+    variance = laplacian.var()
+    
+    is_blurry = variance < threshold
+    
+    if variance >= 500:
+        quality = 'Excellent'
+    elif variance >= 200:
+        quality = 'Good'
+    elif variance >= 100:
+        quality = 'Fair'
+    elif variance >= 50:
+        quality = 'Poor'
+    else:
+        quality = 'Very Poor'
+    
+    return {
+        'variance': variance,
+        'is_blurry': is_blurry,
+        'quality': quality
+    }
+
+
+# Blur map settings
+BLUR_TILE_SIZE = 128          # Tile edge in pixels
+FLAT_TILE_STDDEV = 8.0        # Tiles with less grey-level spread than this hold no print
+FULL_FRAME_OCR_RATIO = 0.9    # Above this sharp ratio, OCR the whole frame in one pass
+
+
+def _tile_sums(integral, ys, xs):
+    """Per-tile sums read from an integral image at the tile grid corners"""
+    return (
+        integral[np.ix_(ys[1:], xs[1:])]
+        - integral[np.ix_(ys[:-1], xs[1:])]
+        - integral[np.ix_(ys[1:], xs[:-1])]
+        + integral[np.ix_(ys[:-1], xs[:-1])]
+    )
+
+
+def _merge_tiles(mask, ys, xs, padding=0):
+    """Merge connected tiles of a boolean grid into pixel bounding boxes"""
+    height, width = int(ys[-1]), int(xs[-1])
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask.astype(np.uint8), connectivity=8)
+
+    regions = []
+    for label in range(1, count):
+        col, row, cols, rows = stats[label][:4]
+        x1 = max(0, int(xs[col]) - padding)
+        y1 = max(0, int(ys[row]) - padding)
+        x2 = min(width, int(xs[col + cols]) + padding)
+        y2 = min(height, int(ys[row + rows]) + padding)
+        regions.append({'x': x1, 'y': y1, 'w': x2 - x1, 'h': y2 - y1})
+
+    # Reading order: top-to-bottom, then left-to-right
+    regions.sort(key=lambda r: (r['y'], r['x']))
+    return regions
+
+
+def compute_blur_map(image_array, tile_size=BLUR_TILE_SIZE, threshold=100.0):
+    """
+    Per-region sharpness map using integral images of the Laplacian and its square.
+
+    Every tile's Laplacian variance is E[L^2] - E[L]^2, read from the integral
+    images in constant time, so the whole map costs one Laplacian pass.
+    Tiles are classified as 'sharp', 'blurry' or 'flat' (no print to judge).
+    """
+    if len(image_array.shape) == 3:
+        gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
+    else:
+        gray = image_array
+
+    height, width = gray.shape[:2]
+    laplacian = cv2.Laplacian(gray, cv2.CV_64F)
+    lap_sum, lap_sq_sum = cv2.integral2(laplacian, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+    gray_sum, gray_sq_sum = cv2.integral2(gray, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+
+    ys = np.append(np.arange(0, height, tile_size), height)
+    xs = np.append(np.arange(0, width, tile_size), width)
+    area = np.outer(np.diff(ys), np.diff(xs)).astype(np.float64)
+
+    lap_mean = _tile_sums(lap_sum, ys, xs) / area
+    variances = np.maximum(_tile_sums(lap_sq_sum, ys, xs) / area - lap_mean ** 2, 0)
+    gray_mean = _tile_sums(gray_sum, ys, xs) / area
+    gray_std = np.sqrt(np.maximum(_tile_sums(gray_sq_sum, ys, xs) / area - gray_mean ** 2, 0))
+
+    flat = gray_std < FLAT_TILE_STDDEV
+    sharp = (variances >= threshold) & ~flat
+    blurry = ~sharp & ~flat
+
+    content_tiles = int((~flat).sum())
+    sharp_ratio = float(sharp.sum()) / content_tiles if content_tiles else 0.0
+
+    states = np.where(sharp, 'sharp', np.where(flat, 'flat', 'blurry'))
+
+    return {
+        'tile_size': tile_size,
+        'rows': len(ys) - 1,
+        'cols': len(xs) - 1,
+        'width': width,
+        'height': height,
+        'threshold': threshold,
+        'variances': np.round(variances, 1).tolist(),
+        'states': states.tolist(),
+        'sharp_ratio': round(sharp_ratio, 3),
+        'sharp_regions': _merge_tiles(sharp, ys, xs, padding=tile_size // 4),
+        'retake_regions': _merge_tiles(blurry, ys, xs)
+    }
+
+
+def extract_text_from_image(image_array, lang_config='eng'):
+    """Extract text using Tesseract OCR"""
+    try:
+        processed_image = preprocess_image(image_array)
+        extracted_text = pytesseract.image_to_string(processed_image, lang=lang_config)
+        return extracted_text
+    except Exception as e:
+        raise OCRError(f"OCR Error: {str(e)}") from e
+
+
+def sharp_region_crops(image_array, blur_map):
+    """
+    The parts of a label worth OCR'ing, as found by compute_blur_map.
+    Returns (crops, full_frame): the whole frame when nearly everything is sharp
+    (one Tesseract call beats several) or when nothing is.
+    """
+    regions = blur_map['sharp_regions']
+    if not regions or blur_map['sharp_ratio'] >= FULL_FRAME_OCR_RATIO:
+        return [image_array], True
+    return [image_array[r['y']:r['y'] + r['h'], r['x']:r['x'] + r['w']] for r in regions], False
+
+
+def join_region_texts(texts, full_frame):
+    if full_frame:
+        return texts[0]
+    return "\n".join(text.strip() for text in texts if text.strip())
+
+
+def extract_text_from_sharp_regions(image_array, blur_map, lang_config='eng'):
+    """OCR only the sharp parts of a label (see sharp_region_crops)"""
+    crops, full_frame = sharp_region_crops(image_array, blur_map)
+    return join_region_texts([extract_text_from_image(crop, lang_config) for crop in crops], full_frame)
+
+
+def ocr_images_batched(images, lang_config='eng'):
+    """
+    OCR many preprocessed images with a single Tesseract run, so process startup
+    and language-model load are paid once: the images are written to a temp dir,
+    passed as a list file, and the text output is split back per page on the
+    form feed Tesseract puts between pages. Falls back to one call per image if
+    the pages don't line up.
+    """
+    if len(images) <= 1:
+        return [pytesseract.image_to_string(image, lang=lang_config) for image in images]
+
+    with tempfile.TemporaryDirectory(prefix="ocr-batch-") as tmp:
+        paths = []
+        for i, image in enumerate(images):
+            path = os.path.join(tmp, f"{i:05d}.png")
+            cv2.imwrite(path, image)
+            paths.append(path)
+        list_path = os.path.join(tmp, "images.txt")
+        with open(list_path, "w") as f:
+            f.write("\n".join(paths) + "\n")
+        output = pytesseract.image_to_string(list_path, lang=lang_config)
+
+    # Tesseract versions differ on whether the last page is followed by a separator
+    pages = output.split("\f")
+    if len(pages) == len(images) + 1 and not pages[-1].strip():
+        pages = pages[:-1]
+    if len(pages) != len(images):
+        return [pytesseract.image_to_string(image, lang=lang_config) for image in images]
+    return pages
+
+
+def check_compliance(extracted_text):
+    """Check compliance against mandatory keywords"""
+    results = {}
+    
+    if not extracted_text:
+        return {field: {"found": False, "matched_keyword": ""} for field in MANDATORY_KEYWORDS}
+    
+    text_lower = extracted_text.lower()
+    
+    for field, field_data in MANDATORY_KEYWORDS.items():
+        keywords = field_data["keywords"]
+        is_found = False
+        matched_keyword = ""
+        
+        for keyword in keywords:
+            keyword_lower = keyword.lower()
+            if keyword_lower in text_lower:
+                is_found = True
+                matched_keyword = keyword
+                break
+        
+        results[field] = {
+            "found": is_found,
+            "matched_keyword": matched_keyword
+        }
+    
+    return results
+
+
+def extract_expiry_date(text):
+    """Extract expiry date from text using regex"""
+    if not text:
+        return None
+    
+    expiry_keywords = [
+        r'expiry\s*date?',
+        r'exp\.?\s*date?',
+        r'best\s*before',
+        r'use\s*by',
+        r'valid\s*until',
+        r'expires?',
+    ]
+    
+    date_patterns = [
+        r'(\d{1,2}[/-.]\d{1,2}[/-.]\d{2,4})',
+        r'(\d{1,2}[/-.]\d{4})',
+        r'((?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s*\d{4})',
+    ]
+    
+    text_lower = text.lower()
+    
+    for keyword_pattern in expiry_keywords:
+        keyword_matches = re.finditer(keyword_pattern, text_lower, re.IGNORECASE)
+        
+        for keyword_match in keyword_matches:
+            keyword_pos = keyword_match.end()
+            search_region = text[keyword_pos:keyword_pos + 50]
+            
+            for date_pattern in date_patterns:
+                date_match = re.search(date_pattern, search_region, re.IGNORECASE)
+                
+                if date_match:
+                    return {
+                        'found': True,
+                        'date_string': date_match.group(1),
+                        'context': text[max(0, keyword_match.start() - 10):keyword_pos + date_match.end() + 10].strip()
+                    }
+    
+    return None
+
+
+def calculate_confidence_score(compliance_results, image_quality):
+    """
+    Phase 3: Enhanced Confidence Scoring
+    Combines compliance rate with image quality
+    Returns score 0-100 with manual review flag if < 70
+    """
+    # Compliance score (60%)
+    found_count = sum(1 for r in compliance_results.values() if r["found"])
+    total_count = len(compliance_results)
+    compliance_score = (found_count / total_count) * 60 if total_count > 0 else 0
+    
+    # Image quality score (40%)
+    quality_scores = {
+        'Excellent': 40,
+        'Good': 32,
+        'Fair': 24,
+        'Poor': 16,
+        'Very Poor': 8
+    }
+    quality_score = quality_scores.get(image_quality['quality'], 20)
+    
+    final_score = round(compliance_score + quality_score, 2)
+    
+    # Determine if manual review needed (Phase 3 Feature)
+    is_blurry = image_quality.get('quality') in ['Poor', 'Very Poor']
+    missing_count = sum(1 for r in compliance_results.values() if not r["found"])
+    
+    needs_manual_review = (
+        final_score < 70 or  # Low confidence
+        is_blurry or  # Blurry image
+        missing_count >= 2  # 2+ missing mandatory fields
+    )
+    
+    return {
+        "score": final_score,
+        "needs_manual_review": needs_manual_review
+    }
+
+
+def process_label_image(image_array, lang_config='eng'):
+    """
+    Full single-label check: image quality, blur map, sharp-region OCR,
+    mandatory keywords, confidence and expiry.
+    Returns plain JSON types so the result can cross process boundaries.
+    """
+    start_time = datetime.utcnow()
+
+    image_quality = check_image_blur(image_array)
+    blur_map = compute_blur_map(image_array)
+    extracted_text = extract_text_from_sharp_regions(image_array, blur_map, lang_config)
+
+    processing_time_ms = (datetime.utcnow() - start_time).total_seconds() * 1000
+    return label_result(extracted_text, image_quality, blur_map, processing_time_ms)
+
+
+def process_label_images(image_arrays, lang_config='eng'):
+    """
+    process_label_image for several labels, with every label's OCR crops read
+    in one Tesseract run (ocr_images_batched). processing_time_ms is the
+    group's time split evenly across its labels.
+    """
+    start_time = datetime.utcnow()
+
+    prepared = []
+    crops = []
+    for image_array in image_arrays:
+        image_quality = check_image_blur(image_array)
+        blur_map = compute_blur_map(image_array)
+        label_crops, full_frame = sharp_region_crops(image_array, blur_map)
+        prepared.append((image_quality, blur_map, full_frame, len(crops), len(label_crops)))
+        crops.extend(preprocess_image(crop) for crop in label_crops)
+
+    texts = ocr_images_batched(crops, lang_config)
+
+    processing_time_ms = (datetime.utcnow() - start_time).total_seconds() * 1000 / max(1, len(image_arrays))
+    return [
+        label_result(join_region_texts(texts[first:first + count], full_frame), image_quality, blur_map, processing_time_ms)
+        for image_quality, blur_map, full_frame, first, count in prepared
+    ]
+
+
+def label_result(extracted_text, image_quality, blur_map, processing_time_ms):
+    """Compliance verdict for a label's OCR text, as plain JSON types"""
+    compliance_results = check_compliance(extracted_text)
+    found_keywords = [field for field, result in compliance_results.items() if result["found"]]
+    missing_keywords = [field for field, result in compliance_results.items() if not result["found"]]
+    compliance_status = "COMPLIANT" if len(missing_keywords) == 0 else "NON_COMPLIANT"
+
+    confidence_data = calculate_confidence_score(compliance_results, image_quality)
+    if confidence_data["needs_manual_review"]:
+        compliance_status = "MANUAL_REVIEW"
+
+    return {
+        "extracted_text": extracted_text,
+        "compliance_status": compliance_status,
+        "confidence_score": confidence_data["score"],
+        "needs_manual_review": confidence_data["needs_manual_review"],
+        "missing_keywords": missing_keywords,
+        "found_keywords": found_keywords,
+        "expiry_info": extract_expiry_date(extracted_text),
+        "image_quality": {
+            "variance": float(image_quality["variance"]),
+            "is_blurry": bool(image_quality["is_blurry"]),
+            "quality": image_quality["quality"]
+        },
+        "blur_map": blur_map,
+        "processing_time_ms": processing_time_ms
+    }
@@ -0,0 +1,190 @@
+"""
+OCR Scheduler
+Shares a fixed number of OCR slots between interactive scans, smart scans and
+batch items. Waiting work is served strictly by priority class
+(interactive > smart > batch), and round-robin across users within a class,
+so one user's burst can't starve others in the same class.
+
+Async endpoints wait with `await scheduler.run(cls, user_id, fn, *args)`; the
+batch dispatcher thread takes free slots with try_acquire() and never queues.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from fastapi.concurrency import run_in_threadpool
+
+PRIORITY_CLASSES = ("interactive", "smart", "batch")
+
+# Concurrent OCR jobs across the API process and its embedded batch workers
+OCR_SLOTS = int(os.getenv("OCR_SLOTS", str(os.cpu_count() or 2)))
+
+# Slots batch work may never take, so an interactive scan always has one ready
+OCR_INTERACTIVE_RESERVED_SLOTS = int(os.getenv("OCR_INTERACTIVE_RESERVED_SLOTS", "1"))
+
+# Recent waits kept per class for the p95 figure
+WAIT_SAMPLES = 500
+
+
+class _Waiter:
+    __slots__ = ("grant", "enqueued_at", "granted")
+
+    def __init__(self, grant):
+        self.grant = grant
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+class _ClassStats:
+    def __init__(self):
+        self.running = 0
+        self.granted = 0
+        self.waited = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.recent_waits = deque(maxlen=WAIT_SAMPLES)
+
+    def record_wait(self, wait_ms: float):
+        self.running += 1
+        self.granted += 1
+        self.waited += 1
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self.recent_waits.append(wait_ms)
+
+
+class OCRScheduler:
+    """Priority classes with per-user fair queuing in front of the OCR workers"""
+
+    def __init__(self, slots: int = OCR_SLOTS, reserved_interactive: int = OCR_INTERACTIVE_RESERVED_SLOTS):
+        self.slots = max(1, slots)
+        # Batch work keeps at least one slot: a reservation covering every slot is cut back, with a warning
+        self.reserved_interactive = min(max(0, reserved_interactive), self.slots - 1)
+        if self.reserved_interactive != reserved_interactive:
+            print(f"OCR scheduler: OCR_INTERACTIVE_RESERVED_SLOTS={reserved_interactive} clamped to "
+                  f"{self.reserved_interactive} so batch items keep one of the {self.slots} slots")
+        self.batch_slots = self.slots - self.reserved_interactive
+        self._lock = threading.Lock()
+        self._in_use = 0
+        # Per class: user -> FIFO of waiters; users rotate to the back once served
+        self._queues = {cls: OrderedDict() for cls in PRIORITY_CLASSES}
+        self._stats = {cls: _ClassStats() for cls in PRIORITY_CLASSES}
+        self._listeners = []
+
+    def subscribe(self, callback):
+        """Call `callback()` whenever a slot is released (e.g. to wake the batch dispatcher)"""
+        self._listeners.append(callback)
+
+    def _has_waiters(self) -> bool:
+        return any(self._queues[cls] for cls in PRIORITY_CLASSES)
+
+    def _next_waiter(self):
+        for cls in PRIORITY_CLASSES:
+            users = self._queues[cls]
+            if users:
+                user, waiters = next(iter(users.items()))
+                waiter = waiters.popleft()
+                if waiters:
+                    users.move_to_end(user)
+                else:
+                    del users[user]
+                return cls, waiter
+        return None, None
+
+    def _dispatch(self):
+        """Hand free slots to waiters (caller holds the lock)"""
+        while self._in_use < self.slots:
+            cls, waiter = self._next_waiter()
+            if waiter is None:
+                return
+            self._in_use += 1
+            waiter.granted = True
+            self._stats[cls].record_wait((time.monotonic() - waiter.enqueued_at) * 1000)
+            waiter.grant()
+
+    async def acquire(self, cls: str, user_id):
+        """Wait for a slot in priority class `cls` on behalf of `user_id`"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = _Waiter(lambda: loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None)))
+        with self._lock:
+            self._queues[cls].setdefault(user_id, deque()).append(waiter)
+            self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if not waiter.granted:
+                    waiters = self._queues[cls].get(user_id)
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del self._queues[cls][user_id]
+            if waiter.granted:
+                self.release(cls)
+            raise
+
+    def try_acquire(self, cls: str, count: int) -> int:
+        """Take up to `count` slots without waiting; none while anything is queued"""
+        with self._lock:
+            if self._has_waiters():
+                return 0
+            limit = self.batch_slots if cls == "batch" else self.slots
+            running_here = self._stats[cls].running if cls == "batch" else 0
+            granted = max(0, min(count, self.slots - self._in_use, limit - running_here))
+            self._in_use += granted
+            self._stats[cls].running += granted
+            self._stats[cls].granted += granted
+            return granted
+
+    def release(self, cls: str, count: int = 1, used: bool = True):
+        """Return slots; used=False for slots taken with try_acquire but never used"""
+        if count <= 0:
+            return
+        with self._lock:
+            self._in_use -= count
+            self._stats[cls].running -= count
+            if not used:
+                self._stats[cls].granted -= count
+            self._dispatch()
+        if used:  # Unused slots were never missed; waking the batch dispatcher again would spin
+            for callback in self._listeners:
+                callback()
+
+    async def run(self, cls: str, user_id, func, *args):
+        """Run blocking OCR work in the threadpool once a slot is granted"""
+        await self.acquire(cls, user_id)
+        try:
+            return await run_in_threadpool(func, *args)
+        finally:
+            self.release(cls)
+
+    def stats(self) -> dict:
+        """
+        Queue depth, running count and wait times per priority class.
+        Batch items queue in the database, not here; see the admin endpoint.
+        """
+        with self._lock:
+            classes = {}
+            for cls in PRIORITY_CLASSES:
+                stats = self._stats[cls]
+                queued = self._queues[cls]
+                now = time.monotonic()
+                oldest = min((waiters[0].enqueued_at for waiters in queued.values()), default=None)
+                waits = sorted(stats.recent_waits)
+                classes[cls] = {
+                    "queued": sum(len(waiters) for waiters in queued.values()),
+                    "queued_users": len(queued),
+                    "running": stats.running,
+                    "granted": stats.granted,
+                    "avg_wait_ms": round(stats.total_wait_ms / stats.waited, 1) if stats.waited else 0.0,
+                    "p95_wait_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 1) if waits else 0.0,
+                    "max_wait_ms": round(stats.max_wait_ms, 1),
+                    "oldest_wait_ms": round((now - oldest) * 1000, 1) if oldest is not None else 0.0
+                }
+            return {
+                "slots": self.slots, "in_use": self._in_use, "reserved_interactive": self.reserved_interactive,
+                "batch_slots": self.batch_slots, "classes": classes
+            }
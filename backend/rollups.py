@@ -0,0 +1,236 @@
+"""
+Compliance Rollups
+Hourly and daily audit-log totals for dashboard trends: scan count and
+confidence sum per bucket for each compliance status, image quality and
+missing field. audit_store updates them in the same transaction as every
+audit-log write, and the delete endpoint takes deleted logs back out, so a
+trend query reads one row per bucket and value whatever the history size.
+
+When audit_rollups is first created (or otherwise no longer adds up to
+audit_counters), the API rebuilds it from history in the background at
+startup (catch_up_audit_rollups). It can be rebuilt at any time
+with rebuild_audit_rollups(), which also takes the logs moved to the Parquet
+archive (audit_archive.py) so trends keep their history.
+"""
+
+import traceback
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterable, List
+
+from sqlalchemy import delete, func, insert, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, AuditLog, AuditCounter, AuditRollup
+
+ROLLUP_PERIODS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+# audit_logs columns a log's rollup contribution is computed from
+ROLLUP_COLUMNS = ["timestamp", "compliance_status", "image_quality", "missing_keywords", "confidence_score"]
+
+# Rows read per round trip when rebuilding from history
+REBUILD_CHUNK_ROWS = 5000
+
+
+def bucket_start(timestamp: datetime, period: str) -> datetime:
+    bucket = timestamp.replace(minute=0, second=0, microsecond=0)
+    return bucket.replace(hour=0) if period == "day" else bucket
+
+
+def rollup_values(row: Dict):
+    """(dimension, value) pairs a log counts towards"""
+    yield "status", row.get("compliance_status") or "UNKNOWN"
+    yield "quality", row.get("image_quality") or "UNKNOWN"
+    for field in (row.get("missing_keywords") or "").split(","):
+        if field.strip():
+            yield "missing", field.strip()
+
+
+def rollup_deltas(rows: List[Dict], sign: int = 1) -> Dict:
+    """(period, bucket_start, dimension, value) -> [count, confidence_sum] for rows"""
+    deltas = {}
+    for row in rows:
+        timestamp = row.get("timestamp") or datetime.utcnow()
+        confidence = sign * (row.get("confidence_score") or 0.0)
+        for period in ROLLUP_PERIODS:
+            bucket = bucket_start(timestamp, period)
+            for dimension, value in rollup_values(row):
+                delta = deltas.setdefault((period, bucket, dimension, value), [0, 0.0])
+                delta[0] += sign
+                delta[1] += confidence
+    return deltas
+
+
+def _params(deltas: Dict) -> List[Dict]:
+    return [
+        {"period": period, "bucket_start": bucket, "dimension": dimension, "value": value,
+         "scan_count": count, "confidence_sum": total}
+        for (period, bucket, dimension, value), (count, total) in deltas.items()
+    ]
+
+
+def update_audit_rollups(db: Session, rows: List[Dict], sign: int = 1):
+    """
+    Add (sign=1) or remove (sign=-1) rows' contribution to audit_rollups, without
+    committing. Rows need timestamp, compliance_status, image_quality,
+    missing_keywords and confidence_score.
+    """
+    params = _params(rollup_deltas(rows, sign))
+    if not params:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = dialect_insert(AuditRollup)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[AuditRollup.period, AuditRollup.bucket_start, AuditRollup.dimension, AuditRollup.value],
+            set_={
+                "scan_count": AuditRollup.scan_count + stmt.excluded.scan_count,
+                "confidence_sum": AuditRollup.confidence_sum + stmt.excluded.confidence_sum
+            }
+        ), params)
+        return
+    for param in params:
+        result = db.execute(
+            update(AuditRollup).where(
+                AuditRollup.period == param["period"],
+                AuditRollup.bucket_start == param["bucket_start"],
+                AuditRollup.dimension == param["dimension"],
+                AuditRollup.value == param["value"]
+            ).values(
+                scan_count=AuditRollup.scan_count + param["scan_count"],
+                confidence_sum=AuditRollup.confidence_sum + param["confidence_sum"]
+            )
+        )
+        if result.rowcount == 0:
+            db.execute(insert(AuditRollup), [param])
+
+
+def _add_deltas(deltas: Dict, rows: List[Dict]):
+    for key, (count, total) in rollup_deltas(rows).items():
+        delta = deltas.setdefault(key, [0, 0.0])
+        delta[0] += count
+        delta[1] += total
+
+
+def _count_logs(db: Session, deltas: Dict, condition) -> int:
+    """Add the rollup deltas of the audit logs matching condition; returns logs counted"""
+    counted = 0
+    result = db.execute(
+        select(*[getattr(AuditLog, column) for column in ROLLUP_COLUMNS])
+        .where(condition)
+        .execution_options(yield_per=REBUILD_CHUNK_ROWS)
+    )
+    for chunk in result.partitions():
+        _add_deltas(deltas, [row._asdict() for row in chunk])
+        counted += len(chunk)
+    return counted
+
+
+def rebuild_audit_rollups(db: Session, archived: Iterable[Dict] = ()) -> int:
+    """
+    Recompute audit_rollups from every audit log, plus `archived` rows (dicts
+    with the rollup columns), and commit; returns logs counted
+
+    History is read before anything is written, so on SQLite the writer lock is
+    only held for the final replace. Logs inserted while history was being
+    read (ids above the high-water mark) are counted inside that transaction;
+    if logs were deleted meanwhile, the live logs are recounted there instead.
+    On PostgreSQL a SHARE lock keeps writes out for the whole rebuild.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE audit_logs IN SHARE MODE"))  # No inserts or deletes while we count
+    high_water = db.scalar(select(func.max(AuditLog.id))) or 0
+
+    archived_deltas = {}
+    archived_counted = 0
+    archived = iter(archived)
+    while chunk := list(islice(archived, REBUILD_CHUNK_ROWS)):
+        _add_deltas(archived_deltas, chunk)
+        archived_counted += len(chunk)
+    log_deltas = {}
+    counted = _count_logs(db, log_deltas, AuditLog.id <= high_water)
+
+    # Short write transaction: on SQLite the DELETE takes the writer lock, so no
+    # log can be written or deleted between the last count and the replace
+    db.execute(delete(AuditRollup))
+    if db.scalar(select(func.count(AuditLog.id)).where(AuditLog.id <= high_water)) != counted:
+        log_deltas = {}
+        counted = _count_logs(db, log_deltas, AuditLog.id <= high_water)
+    counted += _count_logs(db, log_deltas, AuditLog.id > high_water)
+
+    deltas = archived_deltas
+    for key, (count, total) in log_deltas.items():
+        delta = deltas.setdefault(key, [0, 0.0])
+        delta[0] += count
+        delta[1] += total
+    params = _params(deltas)
+    for start in range(0, len(params), REBUILD_CHUNK_ROWS):
+        db.execute(insert(AuditRollup), params[start:start + REBUILD_CHUNK_ROWS])
+    db.commit()
+    return counted + archived_counted
+
+
+def read_trends(db: Session, period: str, start: datetime, end: datetime) -> List[Dict]:
+    """One entry per bucket from start to end (inclusive), empty buckets included"""
+    step = ROLLUP_PERIODS[period]
+    start, end = bucket_start(start, period), bucket_start(end, period)
+    rows = db.execute(
+        select(AuditRollup.bucket_start, AuditRollup.dimension, AuditRollup.value,
+               AuditRollup.scan_count, AuditRollup.confidence_sum)
+        .where(AuditRollup.period == period, AuditRollup.bucket_start >= start, AuditRollup.bucket_start <= end)
+    ).all()
+
+    by_bucket = {}
+    for row in rows:
+        if row.scan_count:
+            by_bucket.setdefault(row.bucket_start, []).append(row)
+
+    trends = []
+    bucket = start
+    while bucket <= end:
+        entry = {"bucket": bucket.isoformat(), "total": 0, "avg_confidence": 0.0, "status": {}, "quality": {}, "missing": {}}
+        confidence_sum = 0.0
+        for row in by_bucket.get(bucket, []):
+            entry[row.dimension][row.value] = row.scan_count
+            if row.dimension == "status":
+                entry["total"] += row.scan_count
+                confidence_sum += row.confidence_sum
+        if entry["total"]:
+            entry["avg_confidence"] = round(confidence_sum / entry["total"], 2)
+        trends.append(entry)
+        bucket += step
+    return trends
+
+
+def rollups_out_of_step(db: Session) -> bool:
+    """
+    Whether audit_rollups doesn't add up to audit_counters (kept in the same
+    transactions), e.g. because it was just created; read in one statement
+    """
+    counted = select(func.coalesce(func.sum(AuditCounter.scan_count), 0)).scalar_subquery()
+    rolled_up = select(func.coalesce(func.sum(AuditRollup.scan_count), 0)).where(
+        AuditRollup.period == "day", AuditRollup.dimension == "status"
+    ).scalar_subquery()
+    counted, rolled_up = db.execute(select(counted, rolled_up)).one()
+    return counted != rolled_up
+
+
+def catch_up_audit_rollups(archived: Iterable[Dict] = ()):
+    """
+    Rebuild audit_rollups from history when it is out of step with the counters,
+    e.g. newly created by whichever process ran init_db() (API startup thread).
+    Logs written meanwhile are counted by the rebuild's final transaction.
+    """
+    db = SessionLocal()
+    try:
+        if not rollups_out_of_step(db):
+            return
+        counted = rebuild_audit_rollups(db, archived)
+        print(f"Audit rollups: counted {counted} existing logs")
+    except Exception:
+        db.rollback()
+        traceback.print_exc()
+    finally:
+        db.close()
@@ -16,6 +16,9 @@ from skimage import io as skio
 from skimage.filters import gaussian
 import io as io_module
 import json
+from xml.sax.saxutils import escape
+
+from ocr_pipeline import join_region_texts, sharp_region_crops
 
 
 class ExplainableAIExtractor:
@@ -55,13 +58,38 @@ class ExplainableAIExtractor:
                         'h': int(data['height'][i])
                     })
             
+            # Image size lets clients scale the boxes without decoding the image
             return {
                 'text': full_text,
-                'items': items
+                'items': items,
+                'width': int(image_array.shape[1]),
+                'height': int(image_array.shape[0])
             }
         except Exception as e:
             print(f"Error extracting coordinates: {e}")
-            return {'text': '', 'items': []}
+            return {'text': '', 'items': [], 'width': int(image_array.shape[1]), 'height': int(image_array.shape[0])}
+    
+    @staticmethod
+    def extract_sharp_with_coordinates(image_array: np.ndarray, blur_map: Dict, lang: str = 'eng') -> Dict:
+        """
+        extract_with_coordinates over only the sharp regions of a blur map (see
+        sharp_region_crops), one pass per region; boxes are in full-image coordinates
+        """
+        crops, full_frame = sharp_region_crops(image_array, blur_map)
+        if full_frame:
+            return ExplainableAIExtractor.extract_with_coordinates(image_array, lang)
+        
+        texts, items = [], []
+        for region, crop in zip(blur_map['sharp_regions'], crops):
+            data = ExplainableAIExtractor.extract_with_coordinates(crop, lang)
+            texts.append(data['text'])
+            items.extend({**item, 'x': item['x'] + region['x'], 'y': item['y'] + region['y']} for item in data['items'])
+        return {
+            'text': join_region_texts(texts, full_frame),
+            'items': items,
+            'width': int(image_array.shape[1]),
+            'height': int(image_array.shape[0])
+        }
 
 
 class FuzzyKeywordMatcher:
@@ -206,9 +234,110 @@ class ForgeryDetector:
             return False, 0.0, f"Could not analyze: {str(e)}"
 
 
+class ImageEncoder:
+    """Encode response images compactly for mobile and IoT clients"""
+
+    MIME_TYPES = {
+        'jpeg': 'image/jpeg',
+        'webp': 'image/webp',
+        'png': 'image/png',
+    }
+    FORMATS = list(MIME_TYPES.keys()) + ['none']
+
+    # Tuned for phones and ESP32 dashboards: small JPEGs, long side <= 1024 px
+    DEFAULT_FORMAT = 'jpeg'
+    DEFAULT_QUALITY = 70
+    DEFAULT_MAX_DIMENSION = 1024
+
+    @staticmethod
+    def downscale(image: np.ndarray, max_dimension: int) -> np.ndarray:
+        """Shrink image so its longest side is at most max_dimension (0 = no limit)"""
+        h, w = image.shape[:2]
+        longest = max(h, w)
+        if not max_dimension or longest <= max_dimension:
+            return image
+        scale = max_dimension / longest
+        return cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def encode(
+        image: np.ndarray,
+        fmt: str = DEFAULT_FORMAT,
+        quality: int = DEFAULT_QUALITY,
+        max_dimension: int = DEFAULT_MAX_DIMENSION
+    ) -> Optional[bytes]:
+        """
+        Encode image to bytes in the requested format
+
+        Args:
+            fmt: 'jpeg', 'webp', 'png' or 'none' (returns None)
+            quality: 1-100, used by JPEG and WebP
+            max_dimension: Longest side in pixels after downscaling (0 = keep size)
+        """
+        if fmt == 'none':
+            return None
+        if fmt not in ImageEncoder.MIME_TYPES:
+            raise ValueError(f"Unsupported image format '{fmt}'. Use one of: {', '.join(ImageEncoder.FORMATS)}")
+
+        image = ImageEncoder.downscale(image, max_dimension)
+        if fmt == 'jpeg':
+            params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+        elif fmt == 'webp':
+            params = [cv2.IMWRITE_WEBP_QUALITY, int(quality)]
+        else:
+            params = [cv2.IMWRITE_PNG_COMPRESSION, 3]
+
+        ok, buffer = cv2.imencode(f'.{fmt}', image, params)
+        if not ok:
+            raise ValueError(f"Could not encode image as {fmt}")
+        return buffer.tobytes()
+
+    @staticmethod
+    def encode_base64(image: np.ndarray, fmt: str = DEFAULT_FORMAT, quality: int = DEFAULT_QUALITY,
+                      max_dimension: int = DEFAULT_MAX_DIMENSION) -> Optional[str]:
+        """Encode image and return it as a base64 string (None for format 'none')"""
+        data = ImageEncoder.encode(image, fmt, quality, max_dimension)
+        return base64.b64encode(data).decode('utf-8') if data is not None else None
+
+
 class SmartAuditorResponse:
     """Format unified response with all auditor features"""
-    
+
+    # How word boxes reach the client:
+    #   server - boxes rasterised onto a copy of the image (default, what existing clients expect)
+    #   client - coordinates only, the frontend draws the boxes (no server rendering; opt in)
+    #   svg    - coordinates plus a small SVG overlay document (opt in)
+    OVERLAY_MODES = ['client', 'svg', 'server']
+    DEFAULT_OVERLAY_MODE = 'server'
+
+    @staticmethod
+    def render_overlay(image: np.ndarray, items: List[Dict]) -> np.ndarray:
+        """Draw word bounding boxes and confidences onto a copy of the image"""
+        visual_image = image.copy()
+        for item in items:
+            x, y, w, h = item['x'], item['y'], item['w'], item['h']
+            cv2.rectangle(visual_image, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            cv2.putText(visual_image, f"{item['text']}({item['confidence']}%)",
+                        (x, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 0), 1)
+        return visual_image
+
+    @staticmethod
+    def render_overlay_svg(items: List[Dict], width: int, height: int) -> str:
+        """Build a transparent SVG document with word boxes, sized to lay over the image"""
+        parts = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+            f'width="{width}" height="{height}" preserveAspectRatio="none">',
+            '<g fill="none" stroke-width="2" font-family="sans-serif" font-size="12">'
+        ]
+        for item in items:
+            x, y, w, h = item['x'], item['y'], item['w'], item['h']
+            color = '#10b981' if item['confidence'] > 80 else '#f59e0b'
+            label = escape(f"{item['text']} ({item['confidence']}%)")
+            parts.append(f'<rect x="{x}" y="{y}" width="{w}" height="{h}" stroke="{color}"/>')
+            parts.append(f'<text x="{x}" y="{max(10, y - 4)}" fill="{color}" stroke="none">{label}</text>')
+        parts.append('</g></svg>')
+        return ''.join(parts)
+
     @staticmethod
     def build_response(
         original_image: np.ndarray,
@@ -220,26 +349,27 @@ class SmartAuditorResponse:
         tamper_detected: bool,
         tamper_score: float,
         compliance_status: str,
-        confidence_score: float
+        confidence_score: float,
+        image_format: str = 'png',
+        image_quality: int = ImageEncoder.DEFAULT_QUALITY,
+        max_dimension: int = 0,
+        overlay_mode: str = 'server'
     ) -> Dict:
         """Build comprehensive Smart AI Auditor response"""
         
         # Encode processed image to base64
-        _, buffer = cv2.imencode('.png', processed_image)
-        processed_image_b64 = base64.b64encode(buffer).decode('utf-8')
-        
-        # Draw bounding boxes on a visual representation
-        visual_image = original_image.copy()
-        for item in coordinate_data.get('items', []):
-            x, y, w, h = item['x'], item['y'], item['w'], item['h']
-            # Draw rectangle
-            cv2.rectangle(visual_image, (x, y), (x + w, y + h), (0, 255, 0), 2)
-            # Put text with confidence
-            cv2.putText(visual_image, f"{item['text']} ({item['confidence']}%)", 
-                       (x, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+        processed_image_b64 = ImageEncoder.encode_base64(processed_image, image_format, image_quality, max_dimension)
         
-        _, buffer = cv2.imencode('.png', visual_image)
-        visual_image_b64 = base64.b64encode(buffer).decode('utf-8')
+        # Word boxes: rasterised, as SVG, or left to the client
+        items = coordinate_data.get('items', [])
+        visual_image_b64 = None
+        overlay_svg = None
+        if overlay_mode == 'server':
+            visual_image = SmartAuditorResponse.render_overlay(original_image, items)
+            visual_image_b64 = ImageEncoder.encode_base64(visual_image, image_format, image_quality, max_dimension)
+        elif overlay_mode == 'svg':
+            h, w = original_image.shape[:2]
+            overlay_svg = SmartAuditorResponse.render_overlay_svg(items, w, h)
         
         # Build compliance results from fuzzy matches
         compliance_results = []
@@ -263,6 +393,9 @@ class SmartAuditorResponse:
             'extracted_text': extracted_text,
             'processed_image': processed_image_b64,
             'visual_analysis_image': visual_image_b64,
+            'visual_overlay_svg': overlay_svg,
+            'overlay_mode': overlay_mode,
+            'image_mime_type': ImageEncoder.MIME_TYPES.get(image_format),
             'coordinates_data': coordinate_data,
             'compliance_results': compliance_results,
             'pii_detected': pii_detected,
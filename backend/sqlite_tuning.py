@@ -0,0 +1,103 @@
+"""
+SQLite Tuning
+Connection settings for SQLite deployments (edge sites), applied on connect:
+WAL journaling so readers never block the writer, synchronous=NORMAL (no fsync
+per commit in WAL mode), a larger page cache, memory-mapped reads and a busy
+timeout instead of failing straight away with "database is locked".
+
+SQLite allows one writer at a time. Rather than have concurrent threads race
+for the database lock, write transactions in this process take turns on a
+single writer lock: a connection takes it with its first INSERT/UPDATE/DELETE
+(or DDL) and gives it back on commit or rollback. Reads never take it.
+Other processes (e.g. `python batch_worker.py`) still wait on busy_timeout.
+"""
+
+import os
+import sqlite3
+import threading
+
+from sqlalchemy import event
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_MB = int(os.getenv("SQLITE_CACHE_SIZE_MB", "64"))  # Per connection
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_SINGLE_WRITER = os.getenv("SQLITE_SINGLE_WRITER", "true").lower() in ("1", "true", "yes")
+
+# Statements that make a transaction a write transaction
+WRITE_STATEMENTS = {"INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "ALTER", "DROP"}
+
+_writer_lock = threading.Lock()
+
+
+class SingleWriterConnection(sqlite3.Connection):
+    """sqlite3 connection that hands the process-wide writer lock back when its transaction ends"""
+
+    holds_writer_lock = False
+
+    def take_writer_lock(self):
+        if self.holds_writer_lock:
+            return
+        if not _writer_lock.acquire(timeout=SQLITE_BUSY_TIMEOUT_MS / 1000):
+            raise sqlite3.OperationalError("database is locked (timed out waiting for the writer lock)")
+        self.holds_writer_lock = True
+
+    def _give_back(self):
+        if self.holds_writer_lock:
+            self.holds_writer_lock = False
+            _writer_lock.release()
+
+    def commit(self):
+        try:
+            super().commit()
+        finally:
+            self._give_back()
+
+    def rollback(self):
+        try:
+            super().rollback()
+        finally:
+            self._give_back()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._give_back()
+
+
+def sqlite_connect_args() -> dict:
+    """connect_args for create_engine on a SQLite URL"""
+    args = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+    if SQLITE_SINGLE_WRITER:
+        args["factory"] = SingleWriterConnection
+    return args
+
+
+def configure_sqlite(engine):
+    """Apply the pragmas to every new connection and enforce the single writer"""
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+            cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+            cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_MB * 1024}")  # Negative = KiB
+            cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+            cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+        finally:
+            cursor.close()
+
+    if not SQLITE_SINGLE_WRITER:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def take_writer_lock(conn, cursor, statement, parameters, context, executemany):
+        keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+        if keyword in WRITE_STATEMENTS:
+            dbapi_connection = conn.connection.dbapi_connection
+            if isinstance(dbapi_connection, SingleWriterConnection):
+                dbapi_connection.take_writer_lock()
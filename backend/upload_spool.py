@@ -0,0 +1,193 @@
+"""
+Streaming Upload Spool
+Parses multipart batch uploads straight off the request stream into files in a
+spool directory, hashing each file as it arrives. Memory use stays at about one
+network chunk, however many images a batch holds and however large they are.
+"""
+
+import hashlib
+import os
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+# Non-file form fields (e.g. tamil_support) are tiny; refuse anything bigger
+MAX_FIELD_BYTES = 1024
+
+
+class SpooledFile:
+    """An uploaded file written to the spool directory, with its SHA-256 and size"""
+
+    def __init__(self, filename: str, content_type: str, path: str):
+        self.filename = filename
+        self.content_type = content_type
+        self.path = path
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._file = open(path, 'wb')
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    def write(self, data: bytes):
+        self._file.write(data)
+        self._hash.update(data)
+        self.size += len(data)
+
+    def close(self):
+        self._file.close()
+
+    def discard(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class MultipartSpooler:
+    """
+    python-multipart callbacks that route file parts to SpooledFiles.
+    File parts of other content types are drained and reported by filename only.
+    """
+
+    def __init__(self, spool_dir: str, max_files: int, max_file_bytes: int, content_types: Tuple[str, ...],
+                 too_many_files_detail: str):
+        self.spool_dir = spool_dir
+        self.max_files = max_files
+        self.too_many_files_detail = too_many_files_detail
+        self.max_file_bytes = max_file_bytes
+        self.content_types = content_types
+        self.files: List[SpooledFile] = []
+        self.skipped: List[str] = []
+        self.fields: Dict[str, str] = {}
+        self._file_count = 0
+        self.pending: List[Tuple[SpooledFile, bytes]] = []
+        self._reset_part()
+
+    def _reset_part(self):
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_name = b""
+        self._header_value = b""
+        self._field_name = None
+        self._field_data = bytearray()
+        self._target = None  # SpooledFile, or None for fields and skipped files
+        self._is_file = False
+
+    def on_part_begin(self):
+        self._reset_part()
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._field_name = options.get(b"name", b"").decode("utf-8", "replace")
+
+        if b"filename" not in options:
+            return
+
+        self._is_file = True
+        self._file_count += 1
+        if self._file_count > self.max_files:
+            raise HTTPException(status_code=400, detail=self.too_many_files_detail)
+
+        filename = options[b"filename"].decode("utf-8", "replace")
+        content_type = self._headers.get(b"content-type", b"").decode("latin-1").strip()
+        if not content_type.startswith(self.content_types):
+            self.skipped.append(filename)
+            return
+
+        spooled = SpooledFile(filename, content_type, os.path.join(self.spool_dir, uuid.uuid4().hex))
+        self.files.append(spooled)
+        self._target = spooled
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._target is not None:
+            self.pending.append((self._target, data[start:end]))
+        elif not self._is_file:
+            self._field_data += data[start:end]
+            if len(self._field_data) > MAX_FIELD_BYTES:
+                raise HTTPException(status_code=400, detail=f"Form field '{self._field_name}' is too large")
+
+    def on_part_end(self):
+        if not self._is_file and self._field_name:
+            self.fields[self._field_name] = self._field_data.decode("utf-8", "replace")
+
+    def write_pending(self):
+        """Write buffered file data to disk (run in the threadpool)"""
+        for spooled, data in self.pending:
+            spooled.write(data)
+            if spooled.size > self.max_file_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"'{spooled.filename}' exceeds {self.max_file_bytes // (1024 * 1024)} MB"
+                )
+        self.pending.clear()
+
+    def discard(self):
+        for spooled in self.files:
+            spooled.discard()
+
+
+async def spool_multipart(
+    request: Request,
+    spool_dir: str,
+    max_files: int,
+    max_file_bytes: int,
+    content_types: Tuple[str, ...] = ("image/",),
+    too_many_files_detail: Optional[str] = None
+) -> Tuple[List[SpooledFile], List[str], Dict[str, str]]:
+    """
+    Stream a multipart/form-data request body into the spool directory.
+    Only file parts whose content type starts with one of `content_types` are kept
+    (an empty string accepts everything).
+    Returns (spooled files, skipped filenames, text fields).
+    On any error every file spooled so far is removed.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    spooler = MultipartSpooler(
+        spool_dir, max_files, max_file_bytes, content_types,
+        too_many_files_detail or f"Maximum {max_files} images per batch"
+    )
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": spooler.on_part_begin,
+        "on_part_data": spooler.on_part_data,
+        "on_part_end": spooler.on_part_end,
+        "on_header_field": spooler.on_header_field,
+        "on_header_value": spooler.on_header_value,
+        "on_header_end": spooler.on_header_end,
+        "on_headers_finished": spooler.on_headers_finished,
+    })
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if spooler.pending:
+                await run_in_threadpool(spooler.write_pending)
+        parser.finalize()
+    except MultipartParseError as e:
+        spooler.discard()
+        raise HTTPException(status_code=400, detail=f"Malformed multipart upload: {str(e)}")
+    except Exception:
+        spooler.discard()
+        raise
+    finally:
+        for spooled in spooler.files:
+            spooled.close()
+
+    return spooler.files, spooler.skipped, spooler.fields
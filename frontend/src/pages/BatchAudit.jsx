@@ -5,25 +5,40 @@ import { Upload, X, FolderOpen, CheckCircle, XCircle, Loader2 } from 'lucide-rea
 import { scanAPI } from '../services/api';
 import { formatBytes } from '../lib/utils';
 
+const MAX_IMAGE_SIZE = 10 * 1024 * 1024;
+const isArchive = (file) => /\.(zip|tar|tgz|tar\.gz)$/i.test(file.name);
+
 export default function BatchAudit() {
   const [files, setFiles] = useState([]);
   const [processing, setProcessing] = useState(false);
   const [results, setResults] = useState(null);
   const [tamilSupport, setTamilSupport] = useState(false);
   const [error, setError] = useState('');
+  const [progress, setProgress] = useState(null);
 
   const onDrop = useCallback((acceptedFiles) => {
-    setFiles(acceptedFiles);
+    // An archive is uploaded on its own; the server expands it into a batch job
+    const archive = acceptedFiles.find(isArchive);
+    setFiles(archive ? [archive] : acceptedFiles);
     setResults(null);
     setError('');
   }, []);
 
   const { getRootProps, getInputProps, isDragActive } = useDropzone({
     onDrop,
-    accept: { 'image/*': ['.png', '.jpg', '.jpeg', '.webp'] },
+    accept: {
+      'image/*': ['.png', '.jpg', '.jpeg', '.webp'],
+      'application/zip': ['.zip'],
+      'application/x-tar': ['.tar'],
+      'application/gzip': ['.tgz', '.gz'],
+    },
     multiple: true,
-    maxSize: 10 * 1024 * 1024,
     maxFiles: 50,
+    // Archives may hold hundreds of photos, so only single images are size-capped
+    validator: (file) =>
+      !isArchive(file) && file.size > MAX_IMAGE_SIZE
+        ? { code: 'file-too-large', message: 'Images must be 10 MB or smaller' }
+        : null,
   });
 
   const handleBatchScan = async () => {
@@ -31,14 +46,40 @@ export default function BatchAudit() {
 
     setProcessing(true);
     setError('');
+    setProgress(null);
 
     try {
-      const batchResults = await scanAPI.batchScan(files, tamilSupport);
-      setResults(batchResults);
+      // Queue the batch, then poll until the workers have finished every image
+      let job =
+        files.length === 1 && isArchive(files[0])
+          ? await scanAPI.createArchiveBatchJob(files[0], tamilSupport)
+          : await scanAPI.createBatchJob(files, tamilSupport);
+      setProgress(job);
+      while (job.status !== 'completed') {
+        await new Promise((resolve) => setTimeout(resolve, 1500));
+        job = await scanAPI.getBatchJob(job.job_id);
+        setProgress(job);
+      }
+
+      const { results: items } = await scanAPI.getBatchJobResults(job.job_id, { limit: job.total_items });
+      const completed = items.filter((item) => item.status === 'completed');
+      const startedAt = new Date(job.created_at).getTime();
+      setResults({
+        total_images: job.total_items,
+        compliant_count: completed.filter((item) => item.compliance_status === 'COMPLIANT').length,
+        non_compliant_count: completed.filter((item) => item.compliance_status !== 'COMPLIANT').length,
+        processing_time_ms: new Date(job.finished_at).getTime() - startedAt,
+        results: items.map((item) => ({
+          ...item,
+          compliance_status: item.compliance_status || 'ERROR',
+          confidence_score: item.confidence_score ?? 0,
+        })),
+      });
     } catch (err) {
       setError(err.response?.data?.detail || 'Batch scan failed. Please try again.');
     } finally {
       setProcessing(false);
+      setProgress(null);
     }
   };
 
@@ -74,7 +115,7 @@ export default function BatchAudit() {
                   {isDragActive ? 'Drop files here' : 'Upload Multiple Images'}
                 </h3>
                 <p className="text-gray-600 dark:text-gray-400">
-                  Drag & drop or click to select up to 50 images
+                  Drag & drop or click to select up to 50 images, or one ZIP/TAR archive
                 </p>
               </div>
             ) : (
@@ -146,7 +187,9 @@ export default function BatchAudit() {
                   {processing ? (
                     <span className="flex items-center justify-center">
                       <Loader2 className="w-5 h-5 mr-2 animate-spin" />
-                      Processing {files.length} images...
+                      {progress
+                        ? `Processed ${progress.completed_items + progress.failed_items} of ${progress.total_items} images...`
+                        : `Uploading ${files.length} file(s)...`}
                     </span>
                   ) : (
                     `Process Batch (${files.length} images)`
@@ -1,9 +1,9 @@
 import { useState } from 'react';
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
+import { useQuery, useInfiniteQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { motion } from 'framer-motion';
 import { Search, Filter, Download, Trash2, CheckCircle, XCircle } from 'lucide-react';
 import { auditAPI } from '../services/api';
-import { formatDate, getComplianceColor } from '../lib/utils';
+import { formatDate, getComplianceColor, downloadFile } from '../lib/utils';
 import { useAuth } from '../contexts/AuthContext';
 
 export default function ComplianceLogs() {
@@ -12,24 +12,50 @@ export default function ComplianceLogs() {
   const { user } = useAuth();
   const queryClient = useQueryClient();
 
-  const { data, isLoading } = useQuery({
+  // Pages of 100, newest first; the status filter runs on the server (indexed keyset pagination)
+  const { data, isLoading, fetchNextPage, hasNextPage, isFetchingNextPage } = useInfiniteQuery({
     queryKey: ['audit-logs', filterStatus],
-    queryFn: () => auditAPI.getAuditLogs({ limit: 100 }),
+    queryFn: ({ pageParam }) =>
+      auditAPI.getAuditLogs({
+        limit: 100,
+        before_id: pageParam ?? undefined,
+        compliance_status: filterStatus === 'ALL' ? undefined : filterStatus,
+      }),
+    initialPageParam: null,
+    getNextPageParam: (lastPage) => lastPage.next_before_id ?? undefined,
+  });
+
+  // Totals come from the stats counters, not from the pages loaded so far
+  const { data: stats } = useQuery({
+    queryKey: ['statistics'],
+    queryFn: auditAPI.getStatistics,
   });
 
   const deleteMutation = useMutation({
     mutationFn: auditAPI.deleteAuditLog,
     onSuccess: () => {
-      queryClient.invalidateQueries(['audit-logs']);
+      queryClient.invalidateQueries({ queryKey: ['audit-logs'] });
+      queryClient.invalidateQueries({ queryKey: ['statistics'] });
+      queryClient.invalidateQueries({ queryKey: ['trends'] });
     },
   });
 
-  const filteredLogs = data?.logs?.filter((log) => {
-    const matchesSearch = log.filename.toLowerCase().includes(searchTerm.toLowerCase());
-    const matchesFilter = filterStatus === 'ALL' || log.compliance_status === filterStatus;
-    return matchesSearch && matchesFilter;
+  // Full export from the server, not just the pages loaded here
+  const exportMutation = useMutation({
+    mutationFn: () =>
+      auditAPI.exportAuditLogs({
+        format: 'csv',
+        compliance_status: filterStatus === 'ALL' ? undefined : filterStatus,
+      }),
+    onSuccess: (blob) => downloadFile(blob, `audit-logs-${new Date().toISOString().slice(0, 10)}.csv`),
   });
 
+  const logs = data?.pages.flatMap((page) => page.logs) ?? [];
+
+  const filteredLogs = logs.filter((log) =>
+    log.filename.toLowerCase().includes(searchTerm.toLowerCase())
+  );
+
   const handleDelete = async (id) => {
     if (window.confirm('Are you sure you want to delete this log?')) {
       await deleteMutation.mutateAsync(id);
@@ -75,9 +101,13 @@ export default function ComplianceLogs() {
           </div>
 
           {/* Export */}
-          <button className="flex items-center justify-center space-x-2 py-2.5 bg-gradient-to-r from-primary-500 to-accent-500 text-white rounded-lg hover:shadow-lg transition-all">
+          <button
+            onClick={() => exportMutation.mutate()}
+            disabled={exportMutation.isPending}
+            className="flex items-center justify-center space-x-2 py-2.5 bg-gradient-to-r from-primary-500 to-accent-500 text-white rounded-lg hover:shadow-lg transition-all disabled:opacity-50"
+          >
             <Download className="w-5 h-5" />
-            <span className="font-medium">Export CSV</span>
+            <span className="font-medium">{exportMutation.isPending ? 'Exporting...' : 'Export CSV'}</span>
           </button>
         </div>
       </div>
@@ -92,7 +122,7 @@ export default function ComplianceLogs() {
             <div>
               <p className="text-sm text-gray-600 dark:text-gray-400">Total Logs</p>
               <p className="text-2xl font-bold text-gray-900 dark:text-white">
-                {data?.total || 0}
+                {stats?.total_scans || 0}
               </p>
             </div>
           </div>
@@ -106,7 +136,7 @@ export default function ComplianceLogs() {
             <div>
               <p className="text-sm text-gray-600 dark:text-gray-400">Compliant</p>
               <p className="text-2xl font-bold text-green-600 dark:text-green-400">
-                {data?.logs?.filter((l) => l.compliance_status === 'COMPLIANT').length || 0}
+                {stats?.compliant_count || 0}
               </p>
             </div>
           </div>
@@ -120,7 +150,7 @@ export default function ComplianceLogs() {
             <div>
               <p className="text-sm text-gray-600 dark:text-gray-400">Non-Compliant</p>
               <p className="text-2xl font-bold text-red-600 dark:text-red-400">
-                {data?.logs?.filter((l) => l.compliance_status === 'NON_COMPLIANT').length || 0}
+                {stats?.non_compliant_count || 0}
               </p>
             </div>
           </div>
@@ -162,14 +192,14 @@ export default function ComplianceLogs() {
                     <div className="loading-spinner mx-auto"></div>
                   </td>
                 </tr>
-              ) : filteredLogs?.length === 0 ? (
+              ) : filteredLogs.length === 0 ? (
                 <tr>
                   <td colSpan="6" className="py-12 text-center text-gray-500">
                     No logs found
                   </td>
                 </tr>
               ) : (
-                filteredLogs?.map((log) => (
+                filteredLogs.map((log) => (
                   <motion.tr
                     key={log.id}
                     initial={{ opacity: 0 }}
@@ -226,6 +256,17 @@ export default function ComplianceLogs() {
             </tbody>
           </table>
         </div>
+        {hasNextPage && (
+          <div className="p-4 border-t border-white/10 text-center">
+            <button
+              onClick={() => fetchNextPage()}
+              disabled={isFetchingNextPage}
+              className="px-6 py-2 glass rounded-lg border border-white/10 text-sm font-medium text-gray-900 dark:text-white hover:bg-white/10 transition-colors disabled:opacity-50"
+            >
+              {isFetchingNextPage ? 'Loading...' : `Load more (${logs.length} shown)`}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -21,12 +21,22 @@ import { formatDate } from '../lib/utils';
 
 const COLORS = ['#10b981', '#ef4444', '#f59e0b', '#6366f1'];
 
+const TREND_DAYS = 14;
+
 export default function Dashboard() {
   const { data: stats, isLoading: statsLoading } = useQuery({
     queryKey: ['statistics'],
     queryFn: auditAPI.getStatistics,
   });
 
+  const { data: trends } = useQuery({
+    queryKey: ['trends', 'day', TREND_DAYS],
+    queryFn: () => {
+      const start = new Date(Date.now() - (TREND_DAYS - 1) * 24 * 60 * 60 * 1000);
+      return auditAPI.getTrends({ period: 'day', start: start.toISOString().slice(0, 10) + 'T00:00:00' });
+    },
+  });
+
   const { data: logsData } = useQuery({
     queryKey: ['audit-logs'],
     queryFn: () => auditAPI.getAuditLogs({ limit: 10 }),
@@ -67,16 +77,13 @@ export default function Dashboard() {
     },
   ];
 
-  // Mock trend data - in production, fetch from backend
-  const trendData = [
-    { date: 'Mon', compliant: 12, nonCompliant: 3 },
-    { date: 'Tue', compliant: 15, nonCompliant: 4 },
-    { date: 'Wed', compliant: 18, nonCompliant: 2 },
-    { date: 'Thu', compliant: 14, nonCompliant: 5 },
-    { date: 'Fri', compliant: 20, nonCompliant: 3 },
-    { date: 'Sat', compliant: 16, nonCompliant: 4 },
-    { date: 'Sun', compliant: 19, nonCompliant: 2 },
-  ];
+  // Daily buckets are UTC dates
+  const trendData = (trends?.buckets || []).map((bucket) => ({
+    date: new Date(bucket.bucket + 'Z').toLocaleDateString('en-US', { month: 'short', day: 'numeric', timeZone: 'UTC' }),
+    compliant: bucket.status.COMPLIANT || 0,
+    nonCompliant: bucket.status.NON_COMPLIANT || 0,
+    manualReview: bucket.status.MANUAL_REVIEW || 0,
+  }));
 
   const pieData = [
     { name: 'Compliant', value: stats?.compliant_count || 0 },
@@ -135,7 +142,7 @@ export default function Dashboard() {
           className="glass glass-dark rounded-xl p-6 border border-white/10"
         >
           <h3 className="text-xl font-bold text-gray-900 dark:text-white mb-6">
-            Weekly Audit Trend
+            Daily Audit Trend ({TREND_DAYS} days)
           </h3>
           <ResponsiveContainer width="100%" height={300}>
             <LineChart data={trendData}>
@@ -167,6 +174,14 @@ export default function Dashboard() {
                 dot={{ fill: '#ef4444', r: 5 }}
                 activeDot={{ r: 8 }}
               />
+              <Line
+                type="monotone"
+                dataKey="manualReview"
+                stroke="#f59e0b"
+                strokeWidth={3}
+                dot={{ fill: '#f59e0b', r: 5 }}
+                activeDot={{ r: 8 }}
+              />
             </LineChart>
           </ResponsiveContainer>
         </motion.div>
@@ -431,8 +431,23 @@ export default function MobileScanner() {
       const blob = await response.blob();
       const file = new File([blob], 'mobile-scan.jpg', { type: 'image/jpeg' });
 
-      // Call backend
-      const scanResult = await scanAPI.smartScan(file, tamilSupport);
+      // Call backend; show the verdict as soon as OCR + compliance are done
+      const scanResult = await scanAPI.smartScanStream(
+        file,
+        tamilSupport,
+        (stage, data) => {
+          if (stage === 'busy') {
+            setError(`Server busy, retrying in ${data.retry_after || 'a few'} seconds...`);
+            return;
+          }
+          if (stage === 'compliance' || stage === 'pii' || stage === 'tamper') {
+            setError(null);
+            setResult((prev) => ({ ...prev, ...data }));
+            setViewMode('result');
+          }
+        },
+        { image_format: 'none' }
+      );
       setResult(scanResult);
       setViewMode('result');
     } catch (err) {
@@ -680,9 +695,13 @@ export default function MobileScanner() {
           )}
 
           {/* Processing Time */}
-          <p className="text-xs text-gray-500 text-center">
-            ⏱️ Processed in {result.processing_time_ms?.toFixed(0)}ms
-          </p>
+          {result.processing_time_ms != null ? (
+            <p className="text-xs text-gray-500 text-center">
+              ⏱️ Processed in {result.processing_time_ms.toFixed(0)}ms
+            </p>
+          ) : (
+            <p className="text-xs text-gray-500 text-center">Running tamper checks...</p>
+          )}
         </motion.div>
       )}
 
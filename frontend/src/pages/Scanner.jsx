@@ -331,6 +331,20 @@ export default function Scanner() {
                       {result.image_quality.is_blurry ? 'Yes' : 'No'}
                     </span>
                   </div>
+                  {result.blur_map && (
+                    <div className="flex justify-between">
+                      <span className="text-gray-600 dark:text-gray-400">Sharp Area</span>
+                      <span className="font-semibold text-gray-900 dark:text-white">
+                        {Math.round(result.blur_map.sharp_ratio * 100)}%
+                      </span>
+                    </div>
+                  )}
+                  {result.blur_map?.retake_regions?.length > 0 && (
+                    <p className="text-sm text-yellow-600 dark:text-yellow-400">
+                      ⚠ {result.blur_map.retake_regions.length} blurred area(s) were skipped by OCR.
+                      Retake a closer photo of the highlighted part of the label.
+                    </p>
+                  )}
                 </div>
               </div>
 
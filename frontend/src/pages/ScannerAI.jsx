@@ -155,12 +155,18 @@ function ImageCanvas({ imageBase64, coordinates, showProcessed = false, processe
   const [dimensions, setDimensions] = useState({ width: 0, height: 0 });
 
   useEffect(() => {
+    // Boxes are drawn client-side (the scan asks for overlay_mode=client); the server reports the
+    // frame size they refer to, so only fall back to decoding the image without it
+    if (coordinates?.width && coordinates?.height) {
+      setDimensions({ width: coordinates.width, height: coordinates.height });
+      return;
+    }
     const img = new Image();
     img.onload = () => {
       setDimensions({ width: img.width, height: img.height });
     };
     img.src = showProcessed ? processedImageBase64 : imageBase64;
-  }, [imageBase64, processedImageBase64, showProcessed]);
+  }, [imageBase64, processedImageBase64, showProcessed, coordinates]);
 
   return (
     <div className="relative rounded-xl overflow-hidden bg-black/50 border border-white/10">
@@ -332,7 +338,7 @@ export default function ScannerAI() {
 
       // Call API
       const scanResult = useSmartAudit
-        ? await scanAPI.smartScan(selectedFile, tamilSupport)
+        ? await scanAPI.smartScan(selectedFile, tamilSupport, { overlay_mode: 'client' })
         : await scanAPI.scanImage(selectedFile, tamilSupport);
 
       addLog('✅ Analysis complete!', 'success');
@@ -584,7 +590,7 @@ export default function ScannerAI() {
                       showProcessed={showProcessed}
                       processedImageBase64={
                         result.processed_image
-                          ? `data:image/png;base64,${result.processed_image}`
+                          ? `data:${result.image_mime_type || 'image/png'};base64,${result.processed_image}`
                           : null
                       }
                     />
@@ -41,10 +41,29 @@ apiClient.interceptors.request.use(
   }
 );
 
+// 429 (server busy): retry after the server's Retry-After estimate, a few times at most
+const MAX_BUSY_RETRIES = 3;
+const MAX_RETRY_DELAY_MS = 30000;
+
+const busyRetryDelayMs = (retryAfter, attempt) => {
+  const seconds = Number(retryAfter);
+  const base = Number.isFinite(seconds) && seconds > 0 ? seconds * 1000 : 2000 * 2 ** attempt;
+  // Jitter so clients turned away together don't come back together
+  return Math.min(base * (1 + Math.random() * 0.25), MAX_RETRY_DELAY_MS);
+};
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
 // Response interceptor for error handling
 apiClient.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const config = error.config;
+    if (error.response?.status === 429 && config && (config.busyRetries || 0) < MAX_BUSY_RETRIES) {
+      config.busyRetries = (config.busyRetries || 0) + 1;
+      await sleep(busyRetryDelayMs(error.response.headers['retry-after'], config.busyRetries));
+      return apiClient(config);
+    }
     if (error.response?.status === 401) {
       // Token expired or invalid
       localStorage.removeItem('access_token');
@@ -127,12 +146,15 @@ export const scanAPI = {
     return response.data;
   },
 
-  smartScan: async (file, tamilSupport = false) => {
+  // imageOptions: { image_format, image_compression_quality, image_max_dimension }
+  // image_format 'none' skips the processed/visual images for clients that never show them
+  smartScan: async (file, tamilSupport = false, imageOptions = {}) => {
     const formData = new FormData();
     formData.append('file', file);
     formData.append('tamil_support', tamilSupport);
 
     const response = await apiClient.post('/smart-scan', formData, {
+      params: imageOptions,
       headers: {
         'Content-Type': 'multipart/form-data',
       },
@@ -140,6 +162,71 @@ export const scanAPI = {
     return response.data;
   },
 
+  // Streaming smart scan: onEvent(stage, data) fires as each stage finishes
+  // (text, compliance, pii, tamper, images); resolves with the full result on 'complete'.
+  // A 429 is retried after Retry-After, with a 'busy' event ({ retry_after }) before each wait.
+  // Uses fetch because axios cannot read a response body incrementally in the browser.
+  smartScanStream: async (file, tamilSupport = false, onEvent = () => {}, imageOptions = {}) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    formData.append('tamil_support', tamilSupport);
+
+    const params = new URLSearchParams({ ...imageOptions, stream_format: 'ndjson' });
+    const token = localStorage.getItem('access_token');
+    let response;
+    for (let attempt = 0; ; attempt++) {
+      response = await fetch(`${API_BASE_URL}/smart-scan/stream?${params}`, {
+        method: 'POST',
+        headers: token ? { Authorization: `Bearer ${token}` } : {},
+        body: formData,
+      });
+      if (response.status !== 429 || attempt >= MAX_BUSY_RETRIES) break;
+      onEvent('busy', { retry_after: Number(response.headers.get('Retry-After')) || null });
+      await sleep(busyRetryDelayMs(response.headers.get('Retry-After'), attempt + 1));
+    }
+
+    if (!response.ok) {
+      const detail = await response.json().catch(() => ({}));
+      if (response.status === 401) {
+        localStorage.removeItem('access_token');
+        localStorage.removeItem('user');
+        window.location.href = '/login';
+      }
+      // Same shape as an axios error so callers can read err.response.data.detail
+      throw { response: { status: response.status, data: detail } };
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = null;
+
+    for (;;) {
+      const { value, done } = await reader.read();
+      buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+
+      const lines = buffer.split('\n');
+      buffer = done ? '' : lines.pop();
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        const { event, data } = JSON.parse(line);
+        if (event === 'error') {
+          throw { response: { status: 500, data } };
+        }
+        if (event === 'complete') {
+          result = data;
+        }
+        onEvent(event, data);
+      }
+      if (done) break;
+    }
+
+    if (!result) {
+      throw new Error('Scan stream ended before completing');
+    }
+    return result;
+  },
+
   batchScan: async (files, tamilSupport = false) => {
     const formData = new FormData();
     files.forEach((file) => {
@@ -154,6 +241,46 @@ export const scanAPI = {
     });
     return response.data;
   },
+
+  // Queue a batch job; returns { job_id, status, status_url, results_url } immediately
+  createBatchJob: async (files, tamilSupport = false) => {
+    const formData = new FormData();
+    files.forEach((file) => {
+      formData.append('files', file);
+    });
+
+    const response = await apiClient.post('/batch-jobs', formData, {
+      params: { tamil_support: tamilSupport },
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+    return response.data;
+  },
+
+  // Queue every image inside a ZIP or TAR archive; results are reported per member path
+  createArchiveBatchJob: async (archive, tamilSupport = false) => {
+    const formData = new FormData();
+    formData.append('file', archive);
+
+    const response = await apiClient.post('/batch-jobs/archive', formData, {
+      params: { tamil_support: tamilSupport },
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+    return response.data;
+  },
+
+  getBatchJob: async (jobId) => {
+    const response = await apiClient.get(`/batch-jobs/${jobId}`);
+    return response.data;
+  },
+
+  getBatchJobResults: async (jobId, params = {}) => {
+    const response = await apiClient.get(`/batch-jobs/${jobId}/results`, { params });
+    return response.data;
+  },
 };
 
 // Audit APIs
@@ -168,6 +295,18 @@ export const auditAPI = {
     return response.data;
   },
 
+  // Per-hour or per-day counts from the backend rollup tables (UTC buckets)
+  getTrends: async (params = {}) => {
+    const response = await apiClient.get('/stats/trends', { params });
+    return response.data;
+  },
+
+  // Streamed by the backend; resolves to a Blob (format: csv, jsonl or parquet)
+  exportAuditLogs: async (params = {}) => {
+    const response = await apiClient.get('/audit-logs/export', { params, responseType: 'blob' });
+    return response.data;
+  },
+
   deleteAuditLog: async (id) => {
     const response = await apiClient.delete(`/audit-logs/${id}`);
     return response.data;